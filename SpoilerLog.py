@@ -1,11 +1,14 @@
 from collections import OrderedDict
-from typing import TextIO
+from dataclasses import dataclass
+from typing import Dict, TextIO
+from weakref import WeakKeyDictionary
 from logic.logic import Placement
 from logic.constants import *
 from logic.logic_input import Areas
 from hints.hint_types import GossipStoneHintWrapper
 from options import OPTIONS, Options
 import itertools
+import json
 
 from version import VERSION
 
@@ -24,6 +27,35 @@ def remove_prefix(region, location):
     return location
 
 
+@dataclass
+class SpoilerRanks:
+    """Positions of the regions, checks and exits in the order of the spoiler log"""
+
+    regions: Dict[str, int]
+    checks: Dict[str, int]
+    exits: Dict[str, int]
+
+
+spoiler_ranks_cache: WeakKeyDictionary[Areas, SpoilerRanks] = WeakKeyDictionary()
+
+
+def ranks(names) -> Dict[str, int]:
+    ranks = {}
+    for i, name in enumerate(names):
+        ranks.setdefault(name, i)
+    return ranks
+
+
+def get_spoiler_ranks(areas: Areas) -> SpoilerRanks:
+    if (spoiler_ranks := spoiler_ranks_cache.get(areas)) is None:
+        spoiler_ranks = spoiler_ranks_cache[areas] = SpoilerRanks(
+            regions=ranks(["Past"] + list(ALL_HINT_REGIONS)),
+            checks=ranks([START_ITEM, UNPLACED_ITEM, DEMISE] + list(areas.checks)),
+            exits=ranks(areas.map_exits),
+        )
+    return spoiler_ranks
+
+
 def write(
     file: TextIO,
     placement: Placement,
@@ -58,13 +90,14 @@ def write(
     # Write spirit of the sword (100% required) locations.
     file.write("SotS:\n")
 
-    sorted_regions = ["Past"] + list(ALL_HINT_REGIONS)
-    sorted_checks = [START_ITEM, UNPLACED_ITEM, DEMISE] + list(areas.checks)
+    spoiler_ranks = get_spoiler_ranks(areas)
+    region_rank = spoiler_ranks.regions
+    check_rank = spoiler_ranks.checks
 
     sots_locations = {
         goal: sorted(
             ((norm(placement.items[item]), item) for item in items),
-            key=lambda c: sorted_checks.index(placement.items[c[1]]),
+            key=lambda c: check_rank[placement.items[c[1]]],
         )
         for goal, items in sots_items.items()
     }
@@ -113,10 +146,7 @@ def write(
                 hint_region = areas.checks[loc]["hint_region"]
                 pretty_sphere.append((hint_region, loc, item))
         pretty_sphere.sort(
-            key=lambda check: (
-                sorted_regions.index(check[0]),
-                sorted_checks.index(check[1]),
-            ),
+            key=lambda check: (region_rank[check[0]], check_rank[check[1]]),
         )
         prettified_spheres.append(
             [
@@ -151,12 +181,7 @@ def write(
         if norm(item) != GRATITUDE_CRYSTAL
     ]
 
-    with_regions.sort(
-        key=lambda check: (
-            sorted_regions.index(check[0]),
-            sorted_checks.index(check[1]),
-        )
-    )
+    with_regions.sort(key=lambda check: (region_rank[check[0]], check_rank[check[1]]))
 
     with_regions = [
         (reg, remove_prefix(reg, norm(loc)), item) for (reg, loc, item) in with_regions
@@ -177,9 +202,8 @@ def write(
     file.write("Entrances:\n")
 
     # Write down exits.
-    sorted_checks = list(areas.map_exits)
     sorted_randomized_entrances = sorted(
-        randomized_entrances.items(), key=lambda c: sorted_checks.index(c[0])
+        randomized_entrances.items(), key=lambda c: spoiler_ranks.exits[c[0]]
     )
     prettified_randomized_entrances = [
         (norm(exit_name), norm(entrance_name))
@@ -272,6 +296,48 @@ def dump_json(
     return spoiler_log
 
 
+def write_ndjson(
+    file: TextIO,
+    placement: Placement,
+    options: Options,
+    *,
+    hash,
+    progression_spheres,
+    hints,
+    required_dungeons,
+    sots_items,
+    barren_nonprogress,
+    randomized_entrances,
+):
+    """
+    Writes the spoiler log as newline-delimited json, one record per line,
+    for programs reading it
+    """
+
+    def record(kind, **fields):
+        file.write(json.dumps({"type": kind} | fields, separators=(",", ":")))
+        file.write("\n")
+
+    record("header", **dump_header_json(options, hash))
+    if options["no-spoiler-log"]:
+        return
+    record("starting-items", items=sorted(placement.starting_items))
+    record("required-dungeons", dungeons=required_dungeons)
+    for goal, items in sots_items.items():
+        record("sots", goal=goal, locations=[placement.items[item] for item in items])
+    barren, nonprogress = barren_nonprogress
+    record("barren-regions", regions=barren)
+    record("nonprogress-regions", regions=nonprogress)
+    for i, sphere in enumerate(progression_spheres, start=1):
+        record("sphere", index=i, locations=sphere)
+    for item, location in placement.items.items():
+        record("item-location", item=item, location=location)
+    for exit, entrance in randomized_entrances.items():
+        record("entrance", exit=exit, entrance=entrance)
+    for hintloc, hint in hints.items():
+        record("hint", location=hintloc, hint=hint.to_spoiler_log_json())
+
+
 def dump_header_json(options: Options, hash):
     header_dict = OrderedDict()
     header_dict["version"] = VERSION
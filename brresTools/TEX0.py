@@ -1,5 +1,4 @@
 # Reference for all image format conversions - https://wiki.tockdom.com/wiki/Image_Formats
-from io import BufferedIOBase
 import numpy as np
 import struct
 
@@ -68,14 +67,14 @@ MASK6 = 0b111111
 class TEX0:
     def __init__(
         self,
-        dataBuffer: BufferedIOBase,
+        data: bytearray | memoryview,
         imgDataOffset: int,
         imageFormat: str,
         width: int,
         height: int,
         numberOfBytesInImage: int,
     ):
-        self.dataBuffer: BufferedIOBase = dataBuffer
+        self.data: bytearray | memoryview = data
         self.imageDataOffset: int = imgDataOffset
         self.imageFormat: str = imageFormat
         self.width: int = width
@@ -83,22 +82,20 @@ class TEX0:
         self.numberOfBytesInImage: int = numberOfBytesInImage
 
     @staticmethod
-    def parse_TEX0(dataBuffer: BufferedIOBase, start_offset: int):
-        dataBuffer.seek(start_offset + 16)
-        section_0_offset = struct.unpack(">I", dataBuffer.read(4))[0]
+    def parse_TEX0(data: bytearray | memoryview, start_offset: int):
+        section_0_offset = struct.unpack_from(">I", data, start_offset + 16)[0]
         img_data_offset = start_offset + section_0_offset
 
-        dataBuffer.seek(start_offset + 28)
-        width = struct.unpack(">H", dataBuffer.read(2))[0]
-        height = struct.unpack(">H", dataBuffer.read(2))[0]
-        image_format = struct.unpack(">I", dataBuffer.read(4))[0]
+        width, height, image_format = struct.unpack_from(
+            ">HHI", data, start_offset + 28
+        )
 
         number_of_bytes_in_image = (
             height * width * IMAGE_FORMATS_BITS_PER_PIXEL[image_format]
         ) // 8
 
         return TEX0(
-            dataBuffer=dataBuffer,
+            data=data,
             imgDataOffset=img_data_offset,
             imageFormat=image_format,
             width=width,
@@ -106,10 +103,20 @@ class TEX0:
             numberOfBytesInImage=number_of_bytes_in_image,
         )
 
-    def get_image_data(self) -> bytes:
-        self.dataBuffer.seek(self.imageDataOffset)
-        imageData = self.dataBuffer.read(self.numberOfBytesInImage)
-        return imageData
+    def get_image_data(self) -> memoryview:
+        # a view into the brres data, nothing is copied until it gets decoded
+        return memoryview(self.data)[
+            self.imageDataOffset : self.imageDataOffset + self.numberOfBytesInImage
+        ]
+
+    def set_image_data(self, rawImageData: bytes):
+        if len(rawImageData) != self.numberOfBytesInImage:
+            raise Exception(
+                "Cannot replace data- Supplied data not same length as original data."
+            )
+        self.data[
+            self.imageDataOffset : self.imageDataOffset + self.numberOfBytesInImage
+        ] = rawImageData
 
     def convert_raw_image_data_to_RGBA(self, data: bytes) -> np.array:
         match IMAGE_FORMATS_NAMES[self.imageFormat]:
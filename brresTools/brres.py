@@ -1,8 +1,8 @@
 from .TEX0 import TEX0
 
-from io import BufferedIOBase
+from io import BufferedIOBase, BytesIO
 import struct
-from typing import List
+from typing import Dict, List
 
 MAGIC_HEADER = b"bres"
 BOM_HEADER = b"\xfe\xff"
@@ -34,95 +34,85 @@ class IndexGroupNode(Node):
     def __init__(self, name: str):
         super().__init__("group", name=name)
         self.childNodes: List[Node] = []
+        self.childNodesByName: Dict[str, Node] = {}
 
     def add_child(self, newChild: Node):
-        if self.get_child(newChild.name) is not None:
+        if newChild.name in self.childNodesByName:
             print(f"{newChild.name} already exists in {self.name}")
             return
         self.childNodes.append(newChild)
+        self.childNodesByName[newChild.name] = newChild
 
     def get_child(self, childName: str) -> Node | None:
-        for child in self.childNodes:
-            if child.name == childName:
-                return child
-        return None
+        return self.childNodesByName.get(childName)
 
 
 class SubFileNode(Node):
-    def __init__(self, fileType: str, name: str, dataOffset: int):
+    def __init__(self, fileType: str, name: str, dataOffset: int, dataLength: int):
         super().__init__(nodeType=fileType, name=name)
         self.dataOffset = dataOffset
+        self.dataLength = dataLength
+        # only the header is parsed on first access, pixels are decoded on request
+        self.tex0: TEX0 | None = None
 
 
 class BRRES:
-    def __init__(self, dataBuffer: BufferedIOBase, rootGroupNode: IndexGroupNode):
-        self.dataBuffer: BufferedIOBase = dataBuffer
+    def __init__(self, data: bytearray, rootGroupNode: IndexGroupNode):
+        self.data: bytearray = data
         self.rootGroupNode: IndexGroupNode = rootGroupNode
 
     @staticmethod
     def parse_brres(dataBuffer: BufferedIOBase):
         dataBuffer.seek(0)
-        if dataBuffer.read(4) != MAGIC_HEADER:
+        data = bytearray(dataBuffer.read())
+        if data[0:4] != MAGIC_HEADER:
             raise Exception("Invalid magic header.")
-        if dataBuffer.read(2) != BOM_HEADER:
+        if data[4:6] != BOM_HEADER:
             raise Exception("Invalid byte order mark.")
-        dataBuffer.seek(12)  # skip to root offset data
-        root_offset = struct.unpack(">H", dataBuffer.read(2))[0]
+        root_offset = struct.unpack_from(">H", data, 12)[0]
 
-        dataBuffer.seek(root_offset + 8)  # skip over root header
-
-        group_start = dataBuffer.tell()
+        group_start = root_offset + 8  # skip over root header
 
         rootGroupNode = IndexGroupNode("root")
         BRRES.parse_index_group_entries(
-            data=dataBuffer,
+            data=data,
             indexGroupNode=rootGroupNode,
             group_start_offset=group_start,
         )
-        return BRRES(dataBuffer=dataBuffer, rootGroupNode=rootGroupNode)
+        return BRRES(data=data, rootGroupNode=rootGroupNode)
 
     @staticmethod
     def parse_index_group_entries(
-        data: BufferedIOBase, indexGroupNode: IndexGroupNode, group_start_offset: int
+        data: bytearray, indexGroupNode: IndexGroupNode, group_start_offset: int
     ):
-        data.seek(group_start_offset)
-        data.seek(data.tell() + 4)
-        num_of_subfolders = struct.unpack(">L", data.read(4))[0]
-        data.seek(data.tell() + 16)  # skips reference point entry
+        num_of_subfolders = struct.unpack_from(">L", data, group_start_offset + 4)[0]
 
-        entries_start = data.tell()
+        entries_start = group_start_offset + 24  # skips reference point entry
         for i in range(num_of_subfolders):
-            data.seek(
-                entries_start + (i * 16) + 8
-            )  # move to current entry and skip to name offset
-            name_offset = struct.unpack(">L", data.read(4))[0]
-            data_offset = struct.unpack(">L", data.read(4))[0]
-
-            data.seek(group_start_offset + name_offset)
-
-            name = ""
-            while True:
-                part = data.read(1)
-                if part == b"\x00":
-                    break
-                name += str(part, "utf-8")
+            # move to current entry and skip to name offset
+            name_offset, data_offset = struct.unpack_from(
+                ">LL", data, entries_start + (i * 16) + 8
+            )
 
-            data.seek(group_start_offset + data_offset)
+            name_start = group_start_offset + name_offset
+            name = str(data[name_start : data.index(b"\x00", name_start)], "utf-8")
 
-            identifier = data.read(4)
+            entry_offset = group_start_offset + data_offset
+            identifier = bytes(data[entry_offset : entry_offset + 4])
 
             if identifier in SECTION_TYPES:
                 entryNode = SubFileNode(
                     fileType=identifier,
                     name=name,
-                    dataOffset=(group_start_offset + data_offset),
+                    dataOffset=entry_offset,
+                    dataLength=struct.unpack_from(">L", data, entry_offset + 4)[0],
                 )
             else:
                 entryNode = IndexGroupNode(name=name)
                 BRRES.parse_index_group_entries(
                     data=data,
                     indexGroupNode=entryNode,
-                    group_start_offset=(group_start_offset + data_offset),
+                    group_start_offset=entry_offset,
                 )
 
             indexGroupNode.add_child(entryNode)
@@ -135,13 +125,8 @@ class BRRES:
                 raise FileNotFoundError(
                     f"Invalid path: {path} in get_file_node- file not final part of path."
                 )
-            found = False
-            for node in currentNode.childNodes:
-                if node.name == part:
-                    currentNode = node
-                    found = True
-                    break
-            if not found:
+            currentNode = currentNode.get_child(part)
+            if currentNode is None:
                 raise FileNotFoundError(
                     f"Invalid path: {path} in get_file_node- {part} not found."
                 )
@@ -153,17 +138,36 @@ class BRRES:
 
         return currentNode
 
+    def get_raw_file_data(self, path: str) -> memoryview:
+        """
+        Returns a view of the undecoded subfile, without copying it
+        the view has to be released before the brres data is modified
+        """
+        file = self.get_file_node(path=path)
+        return memoryview(self.data)[
+            file.dataOffset : file.dataOffset + file.dataLength
+        ]
+
+    def get_texture(self, path: str) -> TEX0:
+        """
+        Returns the parsed TEX0 header of a texture, the image data itself
+        only gets decoded by get_file_data
+        """
+        file = self.get_file_node(path=path)
+        if file.nodeType != b"TEX0":
+            raise Exception(f"{path} is not a texture, but {file.nodeType}.")
+        if file.tex0 is None:
+            file.tex0 = TEX0.parse_TEX0(data=self.data, start_offset=file.dataOffset)
+        return file.tex0
+
     def get_file_data(self, path: str) -> any:
         file = self.get_file_node(path=path)
-        dataOffset = file.dataOffset
 
         match file.nodeType:
             case b"MDL0":
                 raise Exception(f"Unsupported file type {file.nodeType}.")
             case b"TEX0":
-                tex0: TEX0 = TEX0.parse_TEX0(
-                    dataBuffer=self.dataBuffer, start_offset=dataOffset
-                )
+                tex0: TEX0 = self.get_texture(path=path)
                 rawImageData = tex0.get_image_data()
                 return tex0.convert_raw_image_data_to_RGBA(data=rawImageData)
             case b"SRT0":
@@ -189,24 +193,14 @@ class BRRES:
 
     def set_file_data(self, path: str, data: any):
         file = self.get_file_node(path=path)
-        dataOffset = file.dataOffset
 
         match file.nodeType:
             case b"MDL0":
                 raise Exception(f"Unsupported file type {file.nodeType}.")
             case b"TEX0":
-                tex0: TEX0 = TEX0.parse_TEX0(
-                    dataBuffer=self.dataBuffer, start_offset=dataOffset
-                )
+                tex0: TEX0 = self.get_texture(path=path)
                 rawImageData = tex0.convert_RGBA_to_raw_image_data(data=data)
-
-                if len(rawImageData) != tex0.numberOfBytesInImage:
-                    raise Exception(
-                        "Cannot replace data- Supplied data not same length as original data."
-                    )
-
-                self.dataBuffer.seek(tex0.imageDataOffset)
-                self.dataBuffer.write(rawImageData)
+                tex0.set_image_data(rawImageData)
             case b"SRT0":
                 raise Exception(f"Unsupported file type {file.nodeType}.")
             case b"CHR0":
@@ -229,8 +223,8 @@ class BRRES:
                 )
 
     def to_buffer(self) -> BufferedIOBase:
-        self.dataBuffer.seek(0)
-        return self.dataBuffer
+        # textures are patched in place, so every untouched subfile is copied verbatim
+        return BytesIO(self.data)
 
 
 # debug method
@@ -13,6 +13,7 @@ import struct
 
 import nlzss11
 from sslib import AllPatcher, U8File
+from sslib.bzs import ACTOR_OBJTYPES, BzsIndex
 from sslib.msb import process_control_sequences
 from sslib.utils import write_bytes_create_dirs, encodeBytes, toBytes
 from sslib.fs_helpers import write_str, write_u16, write_float, write_u8
@@ -982,20 +983,6 @@ def make_progressive_item(
     msbf["FLW3"]["flow"].append(event)
 
 
-# check highest
-def highest_objid(bzs):
-    max_id = 0
-    for layer in bzs.get("LAY ", {}).values():
-        if len(layer) == 0:
-            continue
-        for objtype in ["OBJS", "OBJ ", "SOBS", "SOBJ", "STAS", "STAG", "SNDT", "DOOR"]:
-            if objtype in layer:
-                id = layer[objtype][-1]["id"] & 0x3FF
-                if id != 0x3FF:  # aparently some objects have the max id?
-                    max_id = max(max_id, id)
-    return max_id
-
-
 def mask_shift_set(value, mask, shift, new_value):
     """
     Replace new_value in value, by applying the mask after the shift
@@ -1135,76 +1122,84 @@ def patch_key_bokoblin_item(boko: OrderedDict, itemid: int):
 
 
 # not treasure chest, wardrobes you can open, used for zelda room HP
-def rando_patch_chest(bzs: OrderedDict, itemid: int, id: str):
+def rando_patch_chest(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
     id = int(id)
     chest = next(
         filter(
-            lambda x: x["name"] == "chest" and (x["params1"] & 0xFF) == id, bzs["OBJ "]
+            lambda x: (x["params1"] & 0xFF) == id,
+            bzs_index.find_by_name(layer, "OBJ ", "chest"),
         )
     )
     patch_chest_item(chest, itemid)
 
 
-def rando_patch_heartco(bzs: OrderedDict, itemid: int, id: str):
-    obj = next(
-        filter(lambda x: x["name"] == "HeartCo", bzs["OBJ "])
-    )  # there is only one heart container at a time
+def rando_patch_heartco(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
+    # there is only one heart container at a time
+    obj = bzs_index.find_by_name(layer, "OBJ ", "HeartCo")[0]
     patch_heart_co(obj, itemid)
 
 
-def rando_patch_warpobj(bzs: OrderedDict, itemid: int, id: str):
-    obj = next(
-        filter(lambda x: x["name"] == "WarpObj", bzs["OBJ "])
-    )  # there is only one trial exit at a time
+def rando_patch_warpobj(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
+    # there is only one trial exit at a time
+    obj = bzs_index.find_by_name(layer, "OBJ ", "WarpObj")[0]
     patch_trial_item(obj, itemid)
 
 
-def rando_patch_tbox(bzs: OrderedDict, itemid: int, id: str, dowsing: int):
+def rando_patch_tbox(
+    bzs_index: BzsIndex, layer: int, itemid: int, id: str, dowsing: int
+):
     id = int(id)
-    tboxs = list(
-        filter(lambda x: x["name"] == "TBox" and (x["anglez"] >> 9) == id, bzs["OBJS"])
-    )
+    tboxs = [
+        x
+        for x in bzs_index.find_by_name(layer, "OBJS", "TBox")
+        if (x["anglez"] >> 9) == id
+    ]
     if len(tboxs) == 0:
         print(tboxs)
     obj = tboxs[0]  # anglez >> 9 is chest id
     patch_tbox_item(obj, itemid, dowsing)
 
 
-def rando_patch_item(bzs: OrderedDict, itemid: int, id: str):
+def rando_patch_item(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
     id = int(id)
     obj = next(
         filter(
-            lambda x: x["name"] == "Item" and ((x["params1"] >> 10) & 0xFF) == id,
-            bzs["OBJ "],
+            lambda x: ((x["params1"] >> 10) & 0xFF) == id,
+            bzs_index.find_by_name(layer, "OBJ ", "Item"),
         )
     )  # (params1 >> 10) & 0xFF is sceneflag
     patch_item_item(obj, itemid)
 
 
-def rando_patch_chandelier(bzs: OrderedDict, itemid: int, id: str):
-    obj = next(filter(lambda x: x["name"] == "Chandel", bzs["OBJ "]))
+def rando_patch_chandelier(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
+    obj = bzs_index.find_by_name(layer, "OBJ ", "Chandel")[0]
     patch_chandelier_item(obj, itemid)
 
 
-def rando_patch_soil(bzs: OrderedDict, itemid: int, id: str):
+def rando_patch_soil(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
     id = int(id)
     obj = next(
         filter(
-            lambda x: x["name"] == "Soil" and ((x["params1"] >> 4) & 0xFF) == id,
-            bzs["OBJ "],
+            lambda x: ((x["params1"] >> 4) & 0xFF) == id,
+            bzs_index.find_by_name(layer, "OBJ ", "Soil"),
         )
     )  # (params1 >> 4) & 0xFF is sceneflag
     patch_soil_item(obj, itemid)
 
 
-def rando_patch_bokoblin(bzs: OrderedDict, itemid: int, id: str):
+def rando_patch_bokoblin(bzs_index: BzsIndex, layer: int, itemid: int, id: str):
     id = int(id, 0)
-    obj = next(filter(lambda x: x["name"] == "EBc" and x["id"] == id, bzs["OBJ "]))
+    obj = next(
+        filter(
+            lambda x: x["name"] == "EBc",
+            bzs_index.find_by_id(layer, "OBJ ", id),
+        )
+    )
     patch_key_bokoblin_item(obj, itemid)
 
 
-def rando_patch_goddess_crest(bzs: OrderedDict, itemid: int, index: str):
-    obj = next(filter(lambda x: x["name"] == "SwSB", bzs["OBJ "]))
+def rando_patch_goddess_crest(bzs_index: BzsIndex, layer: int, itemid: int, index: str):
+    obj = bzs_index.find_by_name(layer, "OBJ ", "SwSB")[0]
     # we need to patch 3 item ids into this object:
     # 1 is params1 FF 00 00 00, 2 is params1 00 FF 00 00
     # 3 is params2 FF 00 00 00
@@ -1216,18 +1211,20 @@ def rando_patch_goddess_crest(bzs: OrderedDict, itemid: int, index: str):
         obj["params2"] = mask_shift_set(obj["params2"], 0xFF, 0x18, itemid)
 
 
-def rando_patch_tadtone_group(bzs: OrderedDict, itemid: int, groupId: str):
+def rando_patch_tadtone_group(
+    bzs_index: BzsIndex, layer: int, itemid: int, groupId: str
+):
     groupId = int(groupId, 0)
     clefs = filter(
-        lambda x: x["name"] == "Clef" and ((x["params1"] >> 3) & 0x1F) == groupId,
-        bzs["OBJ "],
+        lambda x: ((x["params1"] >> 3) & 0x1F) == groupId,
+        bzs_index.find_by_name(layer, "OBJ ", "Clef"),
     )
 
     for clef in clefs:
         clef["anglez"] = mask_shift_set(clef["anglez"], 0xFFFF, 0, itemid)
 
 
-# functions, that patch the object, they take: the bzs of that layer, the item id and optionally an id, then patches the object in place
+# functions, that patch the object, they take: the index of the bzs, the layer, the item id and optionally an id, then patches the object in place
 RANDO_PATCH_FUNCS = {
     "chest": rando_patch_chest,
     "HeartCo": rando_patch_heartco,
@@ -1340,7 +1337,7 @@ def get_patches_from_location_item_list(all_checks, filled_checks, chest_dowsing
 
 
 def get_entry_from_bzs(
-    bzs: OrderedDict, objdef: dict, remove: bool = False
+    bzs_index: BzsIndex, objdef: dict, remove: bool = False
 ) -> Optional[OrderedDict]:
     id = objdef.get("id", None)
     index = objdef.get("index", None)
@@ -1348,24 +1345,21 @@ def get_entry_from_bzs(
     objtype = objdef["objtype"].ljust(
         4
     )  # OBJ has an whitespace but thats was too error prone for the yaml, so just pad it here
-    if layer is None:
-        objlist = bzs[objtype]
-    else:
-        objlist = bzs["LAY "][f"l{layer}"][objtype]
+    objlist = bzs_index.get_list(layer, objtype)
     if not id is None:
-        objs = [x for x in objlist if x["id"] == id]
+        objs = bzs_index.find_by_id(layer, objtype, id)
         if len(objs) != 1:
             print(f"Error finding object: {json.dumps(objdef)}")
             return None
         obj = objs[0]
         if remove:
-            objlist.remove(obj)
+            bzs_index.remove(layer, objtype, obj)
     elif not index is None:
         if index >= len(objlist):
             print(f"Error lisError list index out of range: {json.dumps(objdef)}")
             return None
         if remove:
-            obj = objlist.pop(index)
+            obj = bzs_index.pop(layer, objtype, index)
         else:
             obj = objlist[index]
     else:
@@ -1410,6 +1404,7 @@ class GamePatcher:
                 "selected-loftwing-model-pack"
             ],
             copy_unmodified=False,
+            verify_event_skips=self.options["verify-event-skips"],
         )
         self.text_labels = {}
 
@@ -1438,6 +1433,7 @@ class GamePatcher:
         self.patcher.set_bzs_patch(self.bzs_patch_func)
         self.patcher.set_event_patch(self.flow_patch)
         self.patcher.set_event_text_patch(self.text_patch)
+        self.patcher.set_event_files_to_patch(self.get_event_files_to_patch())
         self.patcher.progress_callback = self.progress_callback
         self.patcher.objpackoarcadd = self.patches["global"].get("objpackoarcadd", [])
         self.patcher.do_patch()
@@ -1451,6 +1447,23 @@ class GamePatcher:
             self.placement_file, self.modified_extract_path, self.actual_extract_path
         )
 
+    def get_event_files_to_patch(self):
+        """
+        Returns the names of all event files that flow_patch or text_patch can modify,
+        so that all other event files can be skipped
+        """
+        event_files = set(
+            filename
+            for filename, patches in self.eventpatches.items()
+            if any(filter(self.filter_option_requirement, patches))
+        )
+        event_files.update(
+            filename for filename, patches in self.rando_eventpatches.items() if patches
+        )
+        # progressive items are always patched in
+        event_files.add("003-ItemGet")
+        return event_files
+
     def filter_option_requirement(self, entry):
         return not (
             isinstance(entry, dict)
@@ -1464,6 +1477,17 @@ class GamePatcher:
         if stage not in self.patches:
             self.patches[stage] = []
         self.patches[stage].append(stagepatch)
+        self.bucket_stage_patch(stage, stagepatch)
+
+    def bucket_stage_patch(self, stage, stagepatch):
+        if not self.filter_option_requirement(stagepatch):
+            return
+        # layer overrides always apply to the stage itself
+        if stagepatch["type"] == "layeroverride":
+            room = None
+        else:
+            room = stagepatch.get("room", None)
+        self.stage_patches_by_room[(stage, room)][stagepatch["type"]].append(stagepatch)
 
     # also used for text
     def add_patch_to_event(self, eventfile, eventpatch):
@@ -1475,6 +1499,15 @@ class GamePatcher:
         self.patches = yaml_load(RANDO_ROOT_PATH / "patches.yaml")
         self.eventpatches = yaml_load(RANDO_ROOT_PATH / "eventpatches.yaml")
 
+        # (stage, room) -> patch type -> patches, room is None for the stage itself
+        # only contains the patches that apply to the selected options
+        self.stage_patches_by_room = defaultdict(lambda: defaultdict(list))
+        for stage, stagepatches in self.patches.items():
+            if stage == "global":
+                continue
+            for stagepatch in stagepatches:
+                self.bucket_stage_patch(stage, stagepatch)
+
         filtered_storyflags = []
         for storyflag in self.patches["global"]["startstoryflags"]:
             # conditionals are an object
@@ -2449,13 +2482,14 @@ class GamePatcher:
                     )
 
     def bzs_patch_func(self, bzs, stage, room):
-        stagepatches = self.patches.get(stage, [])
-        stagepatches = list(filter(self.filter_option_requirement, stagepatches))
+        roompatches = self.stage_patches_by_room.get((stage, room), {})
+        randopatches = self.rando_stagepatches.get((stage, room), [])
+        if not roompatches and not randopatches:
+            return None
+        bzs_index = BzsIndex(bzs)
         modified = False
         if room == None:
-            layer_patches = list(
-                filter(lambda x: x["type"] == "layeroverride", stagepatches)
-            )
+            layer_patches = roompatches.get("layeroverride", [])
             if len(layer_patches) > 1:
                 print(f"ERROR: multiple layer overrides for stage {stage}!")
             elif len(layer_patches) == 1:
@@ -2467,28 +2501,21 @@ class GamePatcher:
                 ]
                 bzs["LYSE"] = layer_override
                 modified = True
-        next_id = highest_objid(bzs) + 1
-        for pathadd in filter(
-            lambda x: x["type"] == "pathadd" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for pathadd in roompatches.get("pathadd", []):
             new_path = DEFAULT_PATH.copy()
             next_pnt = len(bzs["PNT "])
             new_path["pnt_start_idx"] = next_pnt
             new_path["pnt_total_count"] = len(pathadd["pnts"])
-            bzs["PATH"].append(new_path)
+            bzs_index.append(None, "PATH", new_path)
             pnts_to_add = pathadd["pnts"]
             for pnt in pnts_to_add:
                 new_pnt = DEFAULT_PNT.copy()
                 for key, val in pnt.items():
                     if key in new_pnt:
                         new_pnt[key] = val
-                bzs["PNT "].append(new_pnt)
+                bzs_index.append(None, "PNT ", new_pnt)
             modified = True
-        for objadd in filter(
-            lambda x: x["type"] == "objadd" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for objadd in roompatches.get("objadd", []):
             layer = objadd.get("layer", None)
             objtype = objadd["objtype"].ljust(
                 4
@@ -2522,83 +2549,59 @@ class GamePatcher:
                 else:
                     try_patch_obj(new_obj, key, val)
             if "id" in new_obj:
-                new_obj["id"] = (new_obj["id"] & ~0x3FF) | next_id
-                next_id += 1
-            if layer is None:
-                if not objtype in bzs:
-                    bzs[objtype] = []
-                objlist = bzs[objtype]
-            else:
-                if not objtype in bzs["LAY "][f"l{layer}"]:
-                    bzs["LAY "][f"l{layer}"][objtype] = []
-                objlist = bzs["LAY "][f"l{layer}"][objtype]
+                new_obj["id"] = (new_obj["id"] & ~0x3FF) | bzs_index.next_id()
             # add object name to objn if it's some kind of actor
-            if objtype in [
-                "SOBS",
-                "SOBJ",
-                "STAS",
-                "STAG",
-                "SNDT",
-                "OBJS",
-                "OBJ ",
-                "DOOR",
-            ]:
+            if objtype in ACTOR_OBJTYPES:
                 # TODO: this only works if the layer is set
                 if not "OBJN" in bzs["LAY "][f"l{layer}"]:
                     bzs["LAY "][f"l{layer}"]["OBJN"] = []
                 objn = bzs["LAY "][f"l{layer}"]["OBJN"]
                 if not obj["name"] in objn:
                     objn.append(obj["name"])
-            objlist.append(new_obj)
+            bzs_index.append(layer, objtype, new_obj)
             modified = True
             # print(obj)
-        for objpatch in filter(
-            lambda x: x["type"] == "objpatch" and x.get("room", None) == room,
-            stagepatches,
-        ):
-            obj = get_entry_from_bzs(bzs, objpatch)
+        for objpatch in roompatches.get("objpatch", []):
+            obj = get_entry_from_bzs(bzs_index, objpatch)
             if not obj is None:
-                for key, val in objpatch["object"].items():
-                    if key in obj:
-                        obj[key] = val
-                    else:
-                        try_patch_obj(obj, key, val)
+
+                def patch_obj(obj):
+                    for key, val in objpatch["object"].items():
+                        if key in obj:
+                            obj[key] = val
+                        else:
+                            try_patch_obj(obj, key, val)
+
+                bzs_index.patch_object(
+                    objpatch.get("layer", None),
+                    objpatch["objtype"].ljust(4),
+                    obj,
+                    patch_obj,
+                )
                 modified = True
                 # print(f'modified object from {layer} in room {room} with id {objpatch["id"]:04X}')
                 # print(obj)
-        for objmove in filter(
-            lambda x: x["type"] == "objmove" and x.get("room", None) == room,
-            stagepatches,
-        ):
-            obj = get_entry_from_bzs(bzs, objmove, remove=True)
+        for objmove in roompatches.get("objmove", []):
+            obj = get_entry_from_bzs(bzs_index, objmove, remove=True)
             destlayer = objmove["destlayer"]
             if not obj is None:
                 layer = objmove["layer"]
                 objtype = objmove["objtype"].ljust(4)
-                obj["id"] = (obj["id"] & ~0x3FF) | next_id
-                next_id += 1
-                if not objtype in bzs["LAY "][f"l{destlayer}"]:
-                    bzs["LAY "][f"l{destlayer}"][objtype] = []
-                bzs["LAY "][f"l{destlayer}"][objtype].append(obj)
+                obj["id"] = (obj["id"] & ~0x3FF) | bzs_index.next_id()
+                bzs_index.append(destlayer, objtype, obj)
                 objn = bzs["LAY "][f"l{destlayer}"]["OBJN"]
                 if not obj["name"] in objn:
                     objn.append(obj["name"])
                 modified = True
                 # print(f'moved object from {layer} to {destlayer} in room {room} with id {objmove["id"]:04X}')
                 # print(obj)
-        for objdelete in filter(
-            lambda x: x["type"] == "objdelete" and x.get("room", None) == room,
-            stagepatches,
-        ):
-            obj = get_entry_from_bzs(bzs, objdelete, remove=True)
+        for objdelete in roompatches.get("objdelete", []):
+            obj = get_entry_from_bzs(bzs_index, objdelete, remove=True)
             if not obj is None:
                 modified = True
                 # print(f'removed object from {layer} in room {room} with id {objdelete["id"]:04X}')
                 # print(obj)
-        for command in filter(
-            lambda x: x["type"] == "objnadd" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for command in roompatches.get("objnadd", []):
             layer = command.get("layer", None)
             name_to_add = command["objn"]
             if layer is None:
@@ -2612,16 +2615,12 @@ class GamePatcher:
             objlist.append(name_to_add)
 
         # patch randomized items on stages
-        for objname, layer, objid, itemid, dowsing in self.rando_stagepatches.get(
-            (stage, room), []
-        ):
+        for objname, layer, objid, itemid, dowsing in randopatches:
             modified = True
             if objname == "Tbox" or objname == "TBox":
-                RANDO_PATCH_FUNCS[objname](
-                    bzs["LAY "][f"l{layer}"], itemid, objid, dowsing
-                )
+                RANDO_PATCH_FUNCS[objname](bzs_index, layer, itemid, objid, dowsing)
             else:
-                RANDO_PATCH_FUNCS[objname](bzs["LAY "][f"l{layer}"], itemid, objid)
+                RANDO_PATCH_FUNCS[objname](bzs_index, layer, itemid, objid)
 
         if modified:
             # print(json.dumps(bzs))
@@ -2633,6 +2632,13 @@ class GamePatcher:
         modified = False
         flowpatches = self.eventpatches.get(filename, [])
         flowpatches = list(filter(self.filter_option_requirement, flowpatches))
+        if (
+            not flowpatches
+            and not self.rando_eventpatches.get(filename)
+            and filename != "003-ItemGet"
+        ):
+            # nothing to patch, so the flows don't even have to be decoded
+            return None
 
         # dictionary to map flow labels to ids for new flows
         label_to_index = OrderedDict()
@@ -2817,10 +2823,13 @@ class GamePatcher:
         #     for lbl in lbl_list:
         #         hash_b = entrypoint_hash(lbl['name'], len(msbt['LBL1']))
         #         print(f'smile: {bucket} {hash_b}')
-        assert len(msbt["TXT2"]) == len(msbt["ATR1"])
-        modified = False
         textpatches = self.eventpatches.get(filename, [])
         textpatches = list(filter(self.filter_option_requirement, textpatches))
+        if not textpatches:
+            # nothing to patch, so the text doesn't even have to be decoded
+            return None
+        assert len(msbt["TXT2"]) == len(msbt["ATR1"])
+        modified = False
         for command in filter(lambda x: x["type"] == "textpatch", textpatches):
             msbt["TXT2"][command["index"]] = process_control_sequences(
                 command["text"]
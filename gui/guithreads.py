@@ -1,4 +1,5 @@
 from pathlib import Path
+import multiprocessing
 
 from PySide6.QtCore import QThread, Signal
 
@@ -49,9 +50,14 @@ class RandomizerThread(QThread):
                 self.randomizer.randomize(self.update_progress_dialog.emit)
                 break
             except GenerationFailed as e:
-                self.randomizer.init_seed(bump_up=True)
+                # Forking would copy the Qt threads' state into the processes
+                self.randomizer.next_seed(multiprocessing.get_context("spawn"))
                 self.error_retry.emit(str(self.randomizer.seed))
                 continue
+            except StartupException as e:
+                # Such as settings that can't generate any seed
+                self.error_abort.emit(str(e))
+                return
             except Exception as e:
                 self.error_abort.emit(str(e))
             import traceback
@@ -3,13 +3,13 @@ from collections import defaultdict
 import json
 from random import Random
 from typing import Literal
-from logic.inventory import EXTENDED_ITEM
 from logic.logic_input import Areas
 
 from logic.constants import *
 from hints.hint_types import *
 from options import Options
 from logic.randomize import LogicUtils
+from logic.logic_utils import UsefulnessAnalysis
 
 HINTABLE_ITEMS = (
     dict.fromkeys(
@@ -159,9 +159,11 @@ class HintDistribution:
         rng: Random,
         unhintable: List[EIN],
         check_hint_status: Dict[EIN, Literal[None, "sometimes", "always"]],
+        analysis: UsefulnessAnalysis,
     ):
         self.rng = rng
         self.logic = logic
+        self.analysis = analysis
         self.areas = areas
         self.options = options
 
@@ -197,7 +199,7 @@ class HintDistribution:
         self.rng.shuffle(self.required_boss_keys)
 
         # populate our internal list copies for later manipulation
-        self.sots_locations = list(self.logic.get_sots_locations())
+        self.sots_locations = list(analysis.sots_locations[DEMISE])
         self.rng.shuffle(self.sots_locations)
 
         self.goals = [
@@ -209,8 +211,7 @@ class HintDistribution:
 
         self.goal_locations = []
         for goal in self.goals:
-            check = areas.short_to_full(GOAL_CHECKS[goal])
-            goal_locations = list(self.logic.get_sots_locations(EXTENDED_ITEM[check]))
+            goal_locations = list(analysis.sots_locations[goal])
             self.rng.shuffle(goal_locations)
             self.goal_locations.append(goal_locations)
 
@@ -218,7 +219,7 @@ class HintDistribution:
         self.removed_sots_items = []
         for item in self.added_items:
             self.hintable_items.extend([item["name"]] * item["amount"])
-        if SEA_CHART in self.logic.get_useful_items():
+        if SEA_CHART in analysis.useful_items:
             self.hintable_items.append(SEA_CHART)
         for item in self.removed_items:
             if item["type"] == "sots":
@@ -227,11 +228,10 @@ class HintDistribution:
                 self.hintable_items.remove(item["name"])
         self.rng.shuffle(self.hintable_items)
 
-        region_barren, nonprogress = self.logic.get_barren_regions()
-        for zone in region_barren:
+        for zone in analysis.barren_regions:
             if all(
                 loc in self.hinted_locations or loc in self.always_hints
-                for loc in self.logic.locations_by_hint_region(zone)
+                for loc in analysis.locations_by_hint_region[zone]
             ):
                 continue
 
@@ -379,7 +379,7 @@ class HintDistribution:
             for loc in self.logic.placement.locations
             if loc not in self.hinted_locations
             and self.areas.checks[loc]["hint_region"] not in self.barren_hinted_areas
-            and EXTENDED_ITEM[loc] in self.logic.fill_restricted()
+            and loc in self.analysis.reachable_locations
         ]
 
         assert all_locations_without_hint
@@ -480,7 +480,7 @@ class HintDistribution:
         # Failsafes if there are not enough barren hints to fill out the generated hint
         for barren_area_list in (self.barren_dungeons, self.barren_overworld_zones):
             for region in barren_area_list:
-                if not len(self.logic.locations_by_hint_region(region)):
+                if not len(self.analysis.locations_by_hint_region[region]):
                     barren_area_list.remove(region)
 
         if len(self.barren_dungeons) == 0:
@@ -497,12 +497,13 @@ class HintDistribution:
             barren_area_list = self.barren_overworld_zones
 
         weights = [
-            len(self.logic.locations_by_hint_region(area)) for area in barren_area_list
+            len(self.analysis.locations_by_hint_region[area])
+            for area in barren_area_list
         ]
 
         area = self.rng.choices(barren_area_list, weights)[0]
         barren_area_list.remove(area)
-        self.hinted_locations.extend(self.logic.locations_by_hint_region(area))
+        self.hinted_locations.extend(self.analysis.locations_by_hint_region[area])
         self.barren_hinted_areas.add(area)
         self.prev_barren_type = barren_type
 
@@ -7,6 +7,7 @@ from .constants import *
 from .logic import Logic
 from .inventory import BANNED_BIT, EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
 from .fill_algo_common import RandomizationSettings, UserOutput
+from .feasibility import check_reachable_capacity
 
 
 class AssumedFill:
@@ -22,14 +23,10 @@ class AssumedFill:
         self.randosettings = randosettings
 
         full_inventory = Logic.get_everything_unbanned(self.logic.requirements)
+        self.logic.requirements_changed()
 
-        if not (randosettings.check_bits <= full_inventory):
-            raise useroutput.GenerationFailed(
-                f"Could not reach all objectives after entrances randomization."
-            )
-
-        truly_progress_item = Logic.aggregate_requirements(
-            self.logic.requirements, full_inventory, EVERYTHING_UNBANNED_BIT
+        truly_progress_item = self.logic.dependency_graph().closure(
+            EVERYTHING_UNBANNED_BIT, full_inventory
         )
 
         # Initialize item related attributes.
@@ -40,6 +37,10 @@ class AssumedFill:
             if truly_progress_item[EXTENDED_ITEM[item]]
         }
 
+        check_reachable_capacity(
+            self.logic, randosettings, full_inventory, self.progress_items, useroutput
+        )
+
         self.must_be_placed_items = [
             item
             for item in self.randosettings.must_be_placed_items
@@ -110,13 +111,7 @@ class AssumedFill:
         placement_limit: EIN = self.logic.placement.item_placement_limit.get(
             item, EIN("")
         )
-        accessible_locations = self.logic.accessible_checks(placement_limit)
-
-        empty_locations = [
-            loc
-            for loc in accessible_locations
-            if loc not in self.logic.placement.locations
-        ]
+        empty_locations = self.logic.accessible_empty_checks(placement_limit)
 
         if empty_locations:
             location = self.rng.choice(empty_locations)
@@ -127,6 +122,7 @@ class AssumedFill:
         # We have to replace an already placed item
         if not force or depth > 50:
             return False
+        accessible_locations = self.logic.accessible_checks(placement_limit)
         if not accessible_locations:
             raise self.useroutput.GenerationFailed(
                 f"No more locations accessible for {item}."
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, List, Tuple
+
+from .inventory import EXTENDED_ITEM, Inventory
+from .logic_expression import DNFInventory
+
+
+class DependencyGraph:
+    """
+    Which bits appear in the requirement of each bit (forward edges), and in the
+    requirement of which bits each bit appears (reverse edges).
+    Both are stored as compressed rows: the edges of a bit are
+    targets[offsets[bit] : offsets[bit + 1]].
+    The graph does not follow later changes to the requirements, see
+    Logic.dependency_graph.
+    """
+
+    def __init__(self, requirements: List[DNFInventory]):
+        forward: List[List[int]] = []
+        reverse: List[List[int]] = [[] for _ in requirements]
+        for bit, req in enumerate(requirements):
+            needed = set()
+            for conj in req.disjunction:
+                needed |= conj.intset
+            forward.append(sorted(needed))
+            for req_bit in forward[-1]:
+                reverse[req_bit].append(bit)
+
+        self.forward_offsets, self.forward_targets = self.compress(forward)
+        self.reverse_offsets, self.reverse_targets = self.compress(reverse)
+        self._closures: Dict[Tuple[int, int], Inventory] = {}
+
+    @staticmethod
+    def compress(rows: List[List[int]]) -> Tuple[array, array]:
+        offsets = array("l", [0])
+        targets = array("l")
+        for row in rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def requirements_of(self, bit: EXTENDED_ITEM) -> array:
+        return self.forward_targets[
+            self.forward_offsets[bit] : self.forward_offsets[bit + 1]
+        ]
+
+    def dependents_of(self, bit: EXTENDED_ITEM) -> array:
+        return self.reverse_targets[
+            self.reverse_offsets[bit] : self.reverse_offsets[bit + 1]
+        ]
+
+    def aggregate(self, full_inventory: Inventory | None = None) -> Inventory:
+        """Every bit appearing in the requirement of a bit of full_inventory"""
+        allowed = -1 if full_inventory is None else full_inventory.bitset
+        aggregate = set()
+        for bit in range(len(self.forward_offsets) - 1):
+            if allowed >> bit & 1:
+                aggregate.update(self.requirements_of(bit))
+        return Inventory(aggregate)
+
+    def closure(
+        self, start_bit: EXTENDED_ITEM, full_inventory: Inventory | None = None
+    ) -> Inventory:
+        """
+        Every bit start_bit transitively depends on, only going through the bits
+        of full_inventory. Results are cached for the lifetime of the graph.
+        """
+        allowed = -1 if full_inventory is None else full_inventory.bitset
+        if (closure := self._closures.get((start_bit, allowed))) is None:
+            reached = set()
+            todo = [start_bit]
+            while todo:
+                bit = todo.pop()
+                if not allowed >> bit & 1:
+                    continue
+                for req_bit in self.requirements_of(bit):
+                    if req_bit not in reached:
+                        reached.add(req_bit)
+                        todo.append(req_bit)
+            closure = self._closures[start_bit, allowed] = Inventory(reached)
+        return closure
@@ -1,11 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from functools import cache
-from typing import List  # Only for typing purposes
+from typing import Dict, List, Set  # Only for typing purposes
 
 from .logic import Logic, Placement, LogicSettings
-from .logic_input import Areas
+from .logic_input import Areas, Both
 from .logic_expression import DNFInventory
+from .dependency_graph import DependencyGraph
 from .inventory import (
     Inventory,
     EXTENDED_ITEM,
@@ -43,23 +44,113 @@ class EROptions:
     allowed_starting_provinces: List[EIN]
 
 
+class Connectivity:
+    """
+    What can be reached with every unbanned item, kept up to date as exits are
+    linked to entrances: only the dependents of the newly reached bits are
+    evaluated again, instead of filling the whole inventory.
+    """
+
+    def __init__(
+        self, areas: Areas, requirements: List[DNFInventory], banned: List[EIN]
+    ):
+        self.areas = areas
+        self.requirements = requirements
+        self.banned = banned
+        self.graph = DependencyGraph(requirements)
+        # Reverse edges of the requirements added by the links
+        self.link_dependents: Dict[EXTENDED_ITEM, List[EXTENDED_ITEM]] = {}
+        inventory = Inventory(
+            {EXTENDED_ITEM[itemname] for itemname in INVENTORY_ITEMS}
+            | {HINT_BYPASS_BIT}
+        )
+        self.reached = Logic.fill_inventory(requirements, inventory).bitset
+
+    def entrance_bits(self, entrance: EIN) -> List[EXTENDED_ITEM]:
+        if self.areas.entrance_allowed_time_of_day[entrance] == Both:
+            return [
+                EXTENDED_ITEM[make_day(entrance)],
+                EXTENDED_ITEM[make_night(entrance)],
+            ]
+        return [EXTENDED_ITEM[entrance]]
+
+    def is_reached(self, bits: List[EXTENDED_ITEM]) -> bool:
+        return any(self.reached >> bit & 1 for bit in bits)
+
+    def link_requirements(self, exit: EIN, entrance: EIN):
+        banned_bit_inv = DNFInventory(BANNED_BIT)
+        for bit, req in Logic.connection_requirements(self.areas, exit, entrance):
+            yield bit, req & banned_bit_inv if entrance in self.banned else req
+
+    def propagate(self, reached: int, todo: List[EXTENDED_ITEM]) -> int:
+        requirements = self.requirements
+        while todo:
+            bit = todo.pop()
+            for dependent in (
+                *self.graph.dependents_of(bit),
+                *self.link_dependents.get(bit, ()),
+            ):
+                if not reached >> dependent & 1 and requirements[dependent].eval_bitset(
+                    reached
+                ):
+                    reached |= 1 << dependent
+                    todo.append(dependent)
+        return reached
+
+    def reached_with(self, exit: EIN, entrance: EIN) -> int:
+        """What would be reached if exit led to entrance, without linking them"""
+        reached = self.reached
+        todo = []
+        for bit, req in self.link_requirements(exit, entrance):
+            if not reached >> bit & 1 and req.eval_bitset(reached):
+                reached |= 1 << bit
+                todo.append(bit)
+        return self.propagate(reached, todo)
+
+    def link(self, exit: EIN, entrance: EIN):
+        todo = []
+        for bit, req in self.link_requirements(exit, entrance):
+            self.requirements[bit] |= req
+            for conj in req.disjunction:
+                for req_bit in conj.intset:
+                    self.link_dependents.setdefault(req_bit, []).append(bit)
+            if not self.reached >> bit & 1 and req.eval_bitset(self.reached):
+                self.reached |= 1 << bit
+                todo.append(bit)
+        self.reached = self.propagate(self.reached, todo)
+
+
 class EntranceRando:
-    def __init__(self, areas, rng, placement, useroutput, options: EROptions):
+    def __init__(
+        self,
+        areas,
+        rng,
+        placement,
+        useroutput,
+        options: EROptions,
+        runtime_requirements: Dict[EIN, DNFInventory] | None = None,
+        banned: List[EIN] | None = None,
+    ):
         self.areas = areas
         self.rng = rng
         self.placement = placement
         self.useroutput = useroutput
         self.options = options
+        self.runtime_requirements = runtime_requirements or {}
+        self.banned = banned or []
         self.norm = areas.short_to_full
+        # Set by the dungeon, trial and starting entrances randomization
+        self.fixed_exits: Set[EIN] = set()
+        self.fixed_entrances: Set[EIN] = set()
         return
 
     def randomize(self):
         self.vanilla()
+        self.randomize_dungeons_trials_starting_entrances()
         if self.options.randomize_all == "All":
-            self.hacky_entrance_rando()
+            self.randomize_all_entrances()
         else:
             assert self.options.randomize_all == "Vanilla"
-        self.randomize_dungeons_trials_starting_entrances()
 
     def vanilla(self):
         for exit, v in self.areas.map_exits.items():
@@ -89,6 +180,8 @@ class EntranceRando:
                 self.placement.map_transitions[exx1] = en2
             for exx2 in ex2:
                 self.placement.map_transitions[exx2] = en1
+            self.fixed_exits.update(ex1, ex2)
+            self.fixed_entrances.update((en1, en2))
             self.placement.reverse_map_transitions[en1] = ex2[0]
             self.placement.reverse_map_transitions[en2] = ex1[0]
 
@@ -190,8 +283,14 @@ class EntranceRando:
 
         start_entrance = self.rng.choice(possible_start_entrances)
         self.placement.map_transitions[self.norm(START)] = start_entrance
-
-    def hacky_entrance_rando(self):
+        self.fixed_exits.add(self.norm(START))
+
+    def randomize_all_entrances(self):
+        """
+        Links the exits reachable with every item first, one at a time, so that
+        every entrance used is reachable. The last reachable exit is only linked
+        to an entrance that leads to more exits, if there is one left.
+        """
         unrando_exits = list(
             map(
                 self.areas.short_to_full,
@@ -218,6 +317,7 @@ class EntranceRando:
             for k, v in self.areas.map_entrances.items()
             if "stage" in v
             if k not in unrando_entrances
+            if k not in self.fixed_entrances
         )
         exits = list(
             k
@@ -226,6 +326,7 @@ class EntranceRando:
             if "vanilla" in v
             if "Pillar" not in k
             if k not in unrando_exits
+            if k not in self.fixed_exits
         )
 
         self.rng.shuffle(entrances)
@@ -235,6 +336,44 @@ class EntranceRando:
             self.rng.shuffle(l)
             entrances.extend(l)
 
-        for exit, entrance in zip(exits, entrances):
+        requirements, _ = Logic.cached_runtime_requirements(
+            self.areas, self.banned, self.runtime_requirements
+        )
+        connectivity = Connectivity(self.areas, requirements, self.banned)
+        unlinked = dict.fromkeys(exits)
+        for exit, entrance in self.placement.map_transitions.items():
+            if exit not in unlinked:
+                connectivity.link(exit, entrance)
+
+        exit_bits = {exit: EXTENDED_ITEM[exit] for exit in exits}
+        entrance_bits = {
+            entrance: connectivity.entrance_bits(entrance)
+            for entrance in set(entrances)
+        }
+
+        def reached_exits(reached: int) -> List[EIN]:
+            return [exit for exit in unlinked if reached >> exit_bits[exit] & 1]
+
+        while unlinked and (frontier := reached_exits(connectivity.reached)):
+            exit = self.rng.choice(frontier)
+            del unlinked[exit]
+            # Entrances not reached yet first, as some are left unused
+            candidates = sorted(
+                range(len(entrances)),
+                key=lambda i: connectivity.is_reached(entrance_bits[entrances[i]]),
+            )
+            chosen = candidates[0]
+            if len(frontier) == 1 and unlinked:
+                for i in candidates:
+                    if reached_exits(connectivity.reached_with(exit, entrances[i])):
+                        chosen = i
+                        break
+            entrance = entrances.pop(chosen)
+            connectivity.link(exit, entrance)
+            self.placement.map_transitions[exit] = entrance
+            self.placement.reverse_map_transitions[entrance] = exit
+
+        # Exits that can't be reached, even with every item
+        for exit, entrance in zip(unlinked, entrances):
             self.placement.map_transitions[exit] = entrance
             self.placement.reverse_map_transitions[entrance] = exit
@@ -0,0 +1,138 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from .constants import *
+from .logic import Logic, Placement
+from .logic_input import Areas
+from .inventory import BANNED_BIT, EXTENDED_ITEM, Inventory
+from .fill_algo_common import RandomizationSettings, UserOutput
+
+
+# Static checks run before the fill algorithms, to reject settings and entrance
+# layouts that cannot be filled without spending the time to try it.
+# They only test necessary conditions: each item needs its own location.
+# Settings that fail whatever the seed raise SettingsInfeasible, as trying other
+# seeds is pointless, the rest raises GenerationFailed.
+
+
+def region_checks(areas: Areas, placement_limit: EIN) -> List[EIN]:
+    if placement_limit in areas.checks:
+        return [placement_limit]
+    return list(dict.fromkeys(Logic.explore(areas.checks, areas[placement_limit])))
+
+
+def region_name(areas: Areas, placement_limit: EIN) -> str:
+    if not placement_limit:
+        return "the game"
+    if placement_limit in areas.checks:
+        return areas.prettify(placement_limit)
+    return placement_limit
+
+
+def objective_name(areas: Areas, objective: EIN) -> str:
+    try:
+        return areas.prettify(objective)
+    except ValueError:  # Events have no short name
+        return objective.rsplit("\\", 1)[-1]
+
+
+def items_by_region(placement: Placement, items: Iterable[EIN]) -> Dict[EIN, List[EIN]]:
+    """
+    Groups the items by the regions they must be placed in,
+    an item restricted to a sub-region also being counted in the enclosing ones
+    """
+    by_limit = defaultdict(list)
+    for item in items:
+        by_limit[placement.item_placement_limit.get(item, EIN(""))].append(item)
+
+    by_region = {EIN(""): []}
+    for limit in by_limit:
+        by_region[limit] = []
+    for region in by_region:
+        for limit, limited_items in by_limit.items():
+            if limit.startswith(region):
+                by_region[region].extend(limited_items)
+    return by_region
+
+
+def check_placement_capacity(
+    areas: Areas,
+    placement: Placement,
+    randosettings: RandomizationSettings,
+    useroutput: UserOutput,
+    seed_locations: Iterable[EIN] = (),
+):
+    """
+    Checks that every region has enough free locations for its restricted items.
+    The locations in seed_locations, taken depending on the seed, are counted as free
+    so that the result only depends on the settings.
+    """
+    seed_locations = set(seed_locations)
+    items = items_by_region(placement, randosettings.must_be_placed_items)
+    for region, region_items in items.items():
+        free = [
+            loc
+            for loc in region_checks(areas, region)
+            if loc not in placement.locations or loc in seed_locations
+        ]
+        if len(region_items) > len(free):
+            raise useroutput.SettingsInfeasible(
+                f"{len(region_items)} items must be placed in {region_name(areas, region)}, "
+                f"but it only has {len(free)} free locations. "
+                "The settings are too restrictive."
+            )
+
+
+def check_reachable_capacity(
+    logic: Logic,
+    randosettings: RandomizationSettings,
+    full_inventory: Inventory,
+    progress_items: Iterable[EIN],
+    useroutput: UserOutput,
+):
+    """
+    Checks that the objectives are reachable with every item, and that every region
+    has enough reachable free locations for its restricted items,
+    progress items not being allowed in banned locations.
+    full_inventory must be the inventory reachable with every unbanned item.
+    """
+    if not randosettings.check_bits <= full_inventory:
+        unreachable = ", ".join(
+            objective_name(logic.areas, EXTENDED_ITEM.get_item_name(bit))
+            for bit in (randosettings.check_bits - full_inventory).intset
+        )
+        raise useroutput.GenerationFailed(
+            f"Could not reach all objectives after entrances randomization: "
+            f"cannot reach {unreachable}."
+        )
+
+    banned_inventory = Logic.fill_inventory(
+        logic.requirements, full_inventory | BANNED_BIT
+    )
+    progress_items = dict.fromkeys(progress_items)
+    items = items_by_region(
+        logic.placement,
+        progress_items | dict.fromkeys(randosettings.must_be_placed_items),
+    )
+    for region, region_items in items.items():
+        free = [
+            loc
+            for loc in region_checks(logic.areas, region)
+            if loc not in logic.placement.locations
+        ]
+        bits = [logic.areas.checks[loc]["req_index"] for loc in free]
+        reachable = [bit for bit in bits if banned_inventory[bit]]
+        unbanned = [bit for bit in reachable if full_inventory[bit]]
+        region_progress = [item for item in region_items if item in progress_items]
+
+        for count, kind, locations, where in (
+            (len(region_items), "items", reachable, "reachable"),
+            (len(region_progress), "progress items", unbanned, "reachable unbanned"),
+        ):
+            if count > len(locations):
+                raise useroutput.GenerationFailed(
+                    f"{count} {kind} must be placed in {region_name(logic.areas, region)}, "
+                    f"but only {len(locations)} of its {len(free)} free locations are {where} "
+                    "with these settings and entrances."
+                )
@@ -18,3 +18,5 @@ class RandomizationSettings:
 class UserOutput:
     GenerationFailed: Callable[[str], Exception]
     progress_callback: Callable[[str], None]
+    # For the failures that don't depend on the seed
+    SettingsInfeasible: Callable[[str], Exception]
@@ -1,5 +1,7 @@
 from __future__ import annotations
+from collections import defaultdict
 from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set
 import random  # Only for typing purposes
 
 
@@ -7,6 +9,7 @@ from .constants import *
 from .logic import Logic
 from .inventory import BANNED_BIT, EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
 from .fill_algo_common import RandomizationSettings, UserOutput
+from .weighted_sampler import WeightedSampler
 
 
 class FrontFill:
@@ -22,14 +25,15 @@ class FrontFill:
         self.randosettings = randosettings
 
         full_inventory = Logic.get_everything_unbanned(self.logic.requirements)
+        self.logic.requirements_changed()
 
         if not (randosettings.check_bits <= full_inventory):
             raise useroutput.GenerationFailed(
                 f"Could not reach all objectives after entrances randomization."
             )
 
-        truly_progress_item = Logic.aggregate_requirements(
-            self.logic.requirements, full_inventory, EVERYTHING_UNBANNED_BIT
+        truly_progress_item = self.logic.dependency_graph().closure(
+            EVERYTHING_UNBANNED_BIT, full_inventory
         )
 
         # Initialize item related attributes.
@@ -129,13 +133,7 @@ class FrontFill:
 
     def place_dungeon_item(self, item_name):
         placement_limit = self.logic.placement.item_placement_limit[item_name]
-        accessible_locations = self.logic.accessible_checks(placement_limit)
-
-        empty_locations = [
-            loc
-            for loc in accessible_locations
-            if loc not in self.logic.placement.locations
-        ]
+        empty_locations = self.logic.accessible_empty_checks(placement_limit)
 
         if empty_locations:
             location = self.rng.choice(empty_locations)
@@ -148,49 +146,52 @@ class FrontFill:
         )
 
     def randomize_progression_items(self):
-        accessible_undone_locations = [
-            loc
-            for loc in self.logic.accessible_checks()
-            if loc not in self.logic.placement.locations
-        ]
-        if len(accessible_undone_locations) == 0:
+        checks = self.logic.check_list(EIN(""))
+        if not self.logic.accessible_empty_mask():
             raise Exception(
                 "No progress locations are accessible at the very start of the game."
             )
 
-        unplaced_progress_items = list(self.progress_items)
+        unplaced_progress_items = dict.fromkeys(self.progress_items)
 
         # Place progress items.
-        location_weights = {}
+        # A location gets the current weight when it becomes accessible, which then
+        # goes down by 1 at each step until it reaches 1, ie its weight at step t is
+        # 2 * weight - t, until the step it reaches 1
+        location_weights = WeightedSampler(len(checks))
+        weights_reaching_1: Dict[int, List[int]] = defaultdict(list)
+        seen_mask = 0
         current_weight = 1
         while unplaced_progress_items:
-            accessible_undone_locations = [
-                loc
-                for loc in self.logic.accessible_checks()
-                if loc not in self.logic.placement.locations
-            ]
+            accessible_mask = self.logic.accessible_empty_mask()
 
-            if not accessible_undone_locations:
+            if not accessible_mask:
                 raise Exception("No locations left to place progress items.")
 
-            for location in accessible_undone_locations:
-                if location not in location_weights:
-                    location_weights[location] = current_weight
-                elif location_weights[location] > 1:
-                    location_weights[location] -= 1
-            current_weight += 1
-
-            possible_items = unplaced_progress_items.copy()
+            new_mask = accessible_mask & ~seen_mask
+            seen_mask |= new_mask
+            while new_mask:
+                low = new_mask & -new_mask
+                new_mask ^= low
+                index = low.bit_length() - 1
+                location_weights.set_weight(index, 2 * current_weight, -1)
+                weights_reaching_1[2 * current_weight - 1].append(index)
+            for index in weights_reaching_1.pop(current_weight, ()):
+                if accessible_mask >> index & 1:
+                    location_weights.set_weight(index, 1)
+            accessible_count = accessible_mask.bit_count()
+
+            possible_items = list(unplaced_progress_items)
 
             assert len(possible_items)
 
             # Remove duplicates from the list so items like swords and bows aren't so likely to show up early.
             # Don't do this with Eldin Key Pieces or Earth Temple will always be really late in logic. Same with crystals
-            unique_names = []
+            unique_names = set()
             unique_possible_items = []
             for item_name in possible_items:
-                if strip_item_number(item_name) not in unique_names:
-                    unique_names.append(strip_item_number(item_name))
+                if (name := strip_item_number(item_name)) not in unique_names:
+                    unique_names.add(name)
                     unique_possible_items.append(item_name)
                 elif item_name in KEY_PIECES:
                     unique_possible_items.append(item_name)
@@ -202,11 +203,11 @@ class FrontFill:
 
             must_place_useful_item = False
             should_place_useful_item = True
-            if len(accessible_undone_locations) == 1 and len(possible_items) > 1:
+            if accessible_count == 1 and len(possible_items) > 1:
                 # If we're on the last accessible location but not the last item we HAVE to place an item that unlocks new locations.
                 # (Otherwise we will still try to place a useful item, but failing will not result in an error.)
                 must_place_useful_item = True
-            elif len(accessible_undone_locations) >= 10:
+            elif accessible_count >= 10:
                 # If we have a lot of locations open, we don't need to be so strict with prioritizing currently useful items.
                 # This can give the randomizer a chance to place things like Delivery Bag or small keys for dungeons that need x2 to do anything.
                 should_place_useful_item = False
@@ -223,9 +224,7 @@ class FrontFill:
             if must_place_useful_item or should_place_useful_item:
                 shuffled_list = possible_items.copy()
                 self.rng.shuffle(shuffled_list)
-                item_name = self.get_first_useful_item(
-                    shuffled_list, accessible_undone_locations
-                )
+                item_name = self.get_first_useful_item(shuffled_list)
                 if item_name is None:
                     # This means that no item can unlock a new location
                     if must_place_useful_item:
@@ -239,43 +238,63 @@ class FrontFill:
             # We weight it so newly accessible locations are more likely to be chosen.
             # This way there is still a good chance it will not choose a new location.
             # Dungeons are prefered
-            possible_location_weights = []
-            cumul_loc_weight = 0
-            for location_name in accessible_undone_locations:
-                cumul_loc_weight += location_weights[location_name]
-                possible_location_weights.append(cumul_loc_weight)
-
-            location_name = self.rng.choices(
-                accessible_undone_locations, cum_weights=possible_location_weights, k=1
-            )[0]
-            self.logic.place_item(location_name, item_name)
-            unplaced_progress_items.remove(item_name)
+            index = location_weights.sample(self.rng, current_weight)
+            location_weights.set_weight(index, 0)
+            self.logic.place_item(checks[index], item_name)
+            del unplaced_progress_items[item_name]
+            current_weight += 1
 
             # continue loop if items are remaining
 
-    def get_first_useful_item(self, items_to_check, accessible_undone_locations):
+    def get_first_useful_item(self, items_to_check):
         # Searches through a given list of items and returns the first one that opens up at least 1 new ~~location~~ thing.
         # The randomizer shuffles the list before passing it to this function, so in effect it picks a random useful item.
 
         # Originally, this really looked for opened new checks, so this may cause issues
 
+        useful_items = self.get_useful_items(items_to_check)
         for item_name in items_to_check:
-            if not Logic.is_full_inventory(
-                self.logic.requirements,
-                self.logic.full_inventory | EXTENDED_ITEM[item_name],
-            ):
+            if item_name in useful_items:
                 return item_name
         return None
 
+    def get_useful_items(self, items: Iterable[EIN]) -> Set[EIN]:
+        """
+        The items that would each make something new accessible, found in one pass.
+        As the full inventory is filled, a bit can only become accessible through a
+        conjunction missing nothing but the bit of the item, so only the bits
+        depending on the items have to be looked at.
+        """
+        full_bitset = self.logic.full_inventory.bitset
+        dependents = self.logic.get_dependents()
+        candidates = {EXTENDED_ITEM[item_name]: item_name for item_name in items}
+        candidates_mask = 0
+        for item_bit in candidates:
+            candidates_mask |= 1 << item_bit
+
+        frontier = {
+            bit
+            for item_bit in candidates
+            for bit in dependents.get(item_bit, ())
+            if not full_bitset >> bit & 1
+        }
+        useful_items = set()
+        for bit in frontier:
+            for conj in self.logic.requirements[bit].bitsets:
+                missing = conj & ~full_bitset
+                if (
+                    missing & candidates_mask
+                    and not missing & (missing - 1)
+                    and missing != 1 << bit
+                ):
+                    useful_items.add(candidates[missing.bit_length() - 1])
+        return useful_items
+
     def randomize_nonprogress_items(self):
         # Place unique non-progress items.
         to_place = list(self.must_be_placed_items)
         while to_place:
-            accessible_undone_locations = [
-                loc
-                for loc in self.logic.accessible_checks()
-                if loc not in self.logic.placement.locations
-            ]
+            accessible_undone_locations = self.logic.accessible_empty_checks()
 
             item_name = self.rng.choice(to_place)
 
@@ -293,11 +312,7 @@ class FrontFill:
             self.logic.placement.item_placement_limit[item_name] == EIN("")
             for item_name in self.may_be_placed_items
         )
-        empty_locations = [
-            loc
-            for loc in self.logic.accessible_checks()
-            if loc not in self.logic.placement.locations
-        ]
+        empty_locations = self.logic.accessible_empty_checks()
 
         to_place = list(self.may_be_placed_items)
         self.rng.shuffle(to_place)
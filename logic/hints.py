@@ -7,6 +7,7 @@ from logic.logic_input import Areas
 from hints.hint_distribution import HintDistribution
 from hints.hint_types import *
 from .randomize import LogicUtils, UserOutput
+from .logic_utils import UsefulnessAnalysis
 from options import Options
 from paths import CUSTOM_HINT_DISTRIBUTION_PATH, RANDO_ROOT_PATH
 from typing import Dict, List
@@ -15,8 +16,18 @@ STATUS = Enum("STATUS", ["required", "useful", "useless"])
 
 
 class Hints:
-    def __init__(self, options: Options, rng, areas: Areas, logic: LogicUtils):
+    def __init__(
+        self,
+        options: Options,
+        rng,
+        areas: Areas,
+        logic: LogicUtils,
+        analysis: UsefulnessAnalysis | None = None,
+    ):
         self.logic = logic
+        if analysis is None:
+            analysis = logic.analyse_usefulness()
+        self.analysis = analysis
         self.areas = areas
         self.norm = areas.short_to_full
         self.placement = logic.placement
@@ -47,9 +58,9 @@ class Hints:
                 self.hinted_checks.append(check)
 
             status: Enum
-            if item in self.logic.get_sots_items():
+            if item in self.analysis.sots_items[DEMISE]:
                 status = STATUS.required
-            elif item in self.logic.get_useful_items():
+            elif item in self.analysis.useful_items:
                 status = STATUS.useful
             else:
                 status = STATUS.useless
@@ -109,11 +120,10 @@ class Hints:
         }
 
         # ensure prerandomized and banned locations cannot be hinted
-        not_banned = self.logic.fill_restricted()
         banned_locs = [
             loc
-            for loc, check in self.areas.checks.items()
-            if not not_banned[check["req_index"]]
+            for loc in self.areas.checks
+            if loc not in self.analysis.reachable_locations
         ]
         unhintables = (
             banned_locs + self.logic.known_locations + [START_ITEM, UNPLACED_ITEM]
@@ -128,6 +138,7 @@ class Hints:
             self.rng,
             unhintables + hinted_checks,
             check_hint_status,
+            self.analysis,
         )
 
         self.logic.fill_inventory_i(monotonic=True)
@@ -179,9 +190,8 @@ class Hints:
 
             self.logic.inventory |= hint_bit
 
-        self.logic.aggregate = self.logic.aggregate_requirements(
-            self.logic.requirements, None
-        )
+        self.logic.requirements_changed()
+        self.logic.aggregate = self.logic.dependency_graph().aggregate()
         self.logic.fill_inventory_i(monotonic=False)
 
         for hintname in hints:
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Set, List, Tuple
+from typing import Dict, Set, List, Tuple
 
 from yaml_files import options
 from .constants import *
@@ -197,13 +197,23 @@ class Inventory:
 
     @staticmethod
     def simplify_invset(argset):
+        # A strict subset has fewer bits, so each inventory is only compared
+        # against the smaller ones
+        by_size: Dict[int, List[int]] = {}
+        for inv in argset:
+            by_size.setdefault(inv.bitset.bit_count(), []).append(inv.bitset)
+
         def gen():
-            for bitset in argset:
-                for bitset2 in argset:
-                    if bitset2 <= bitset and bitset2 != bitset:
-                        break
-                else:
-                    yield bitset
+            for inv in argset:
+                bitset = inv.bitset
+                size = bitset.bit_count()
+                if not any(
+                    bitset2 & bitset == bitset2
+                    for size2, bitsets in by_size.items()
+                    if size2 < size
+                    for bitset2 in bitsets
+                ):
+                    yield inv
 
         return set(gen())
 
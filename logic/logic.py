@@ -1,14 +1,16 @@
 from __future__ import annotations
-from functools import cache
+from functools import wraps
 from typing import Any, Dict, Iterable, List, Set, Tuple
 from collections import defaultdict
 from dataclasses import dataclass, field
+from weakref import WeakKeyDictionary
 
 from hints.hint_types import GossipStoneHintWrapper, Hint
 
 from .constants import *
 from .logic_input import Area, Areas, DayOnly, NightOnly, Both
 from .logic_expression import DNFInventory, AndCombination
+from .dependency_graph import DependencyGraph
 from .inventory import (
     HINT_BYPASS_BIT,
     EVERYTHING_BIT,
@@ -20,6 +22,35 @@ from .inventory import (
 )
 
 
+# Per Areas, the requirements and opaques once the runtime requirements of
+# a few settings are applied, shared by the seeds generated with them
+MAX_CACHED_RUNTIME_REQUIREMENTS = 8
+runtime_requirements_cache: WeakKeyDictionary[
+    Areas, Dict[Tuple, Tuple[List[DNFInventory], List[bool]]]
+] = WeakKeyDictionary()
+pure_usefuls_cache: WeakKeyDictionary[Areas, Inventory] = WeakKeyDictionary()
+
+
+def instance_cache(method):
+    """
+    Like functools.cache, but the results are stored on the instance,
+    so they don't keep it alive and go away with it
+    """
+    cache_name = f"_{method.__name__}_cache"
+
+    @wraps(method)
+    def cached(self, *args):
+        try:
+            cache = self.__dict__[cache_name]
+        except KeyError:
+            cache = self.__dict__[cache_name] = {}
+        if args not in cache:
+            cache[args] = method(self, *args)
+        return cache[args]
+
+    return cached
+
+
 @dataclass
 class PoolEntrance:
     entrance: EXTENDED_ITEM_NAME
@@ -160,22 +191,63 @@ class LogicSettings:
 class Logic:
     @staticmethod
     def fill_inventory(requirements: List[DNFInventory], inventory: Inventory):
+        bitset = inventory.bitset
+        added = set()
         keep_going = True
         while keep_going:
             keep_going = False
             for i in EXTENDED_ITEM.items():
-                if not inventory[i] and requirements[i].eval(inventory):
-                    inventory |= i
+                if not bitset >> i & 1 and requirements[i].eval_bitset(bitset):
+                    bitset |= 1 << i
+                    added.add(i)
                     keep_going = True
-        return inventory
+        if not added:
+            return inventory
+        return Inventory((bitset, inventory.intset | added))
 
     @staticmethod
     def is_full_inventory(requirements: List[DNFInventory], inventory: Inventory):
+        bitset = inventory.bitset
         for i in EXTENDED_ITEM.items():
-            if not inventory[i] and requirements[i].eval(inventory):
+            if not bitset >> i & 1 and requirements[i].eval_bitset(bitset):
                 return False
         return True
 
+    @staticmethod
+    def shrink_inventory(
+        requirements: List[DNFInventory],
+        dependents: Dict[EXTENDED_ITEM, Set[EXTENDED_ITEM]],
+        full_inventory: Inventory,
+        inventory: Inventory,
+        removed: Iterable[EXTENDED_ITEM],
+    ):
+        """
+        Turns full_inventory, a fill of inventory, into the fill with the current
+        requirements, when the bits in removed have lost some of their requirements.
+        Bits depending on them are removed, then those that can still be obtained
+        are filled again.
+        dependents must contain at least every reverse edge of the requirements
+        used for full_inventory.
+        """
+        todo = [bit for bit in removed if full_inventory[bit] and not inventory[bit]]
+        lost = set(todo)
+        while todo:
+            for bit in dependents.get(todo.pop(), ()):
+                if bit not in lost and full_inventory[bit] and not inventory[bit]:
+                    lost.add(bit)
+                    todo.append(bit)
+
+        full_inventory -= Inventory(lost)
+        keep_going = True
+        while keep_going:
+            keep_going = False
+            for bit in list(lost):
+                if requirements[bit].eval(full_inventory):
+                    full_inventory |= bit
+                    lost.remove(bit)
+                    keep_going = True
+        return full_inventory
+
     @staticmethod
     def aggregate_requirements(
         requirements: List[DNFInventory],
@@ -220,8 +292,10 @@ class Logic:
     @staticmethod
     def free_simplify(requirements, free: Inventory):
         req = DNFInventory(True)
-        for i in Logic.fill_inventory(requirements, free) - free:
+        free_inventory = Logic.fill_inventory(requirements, free)
+        for i in free_inventory - free:
             requirements[i] = req
+        return free_inventory
 
     @staticmethod
     def shallow_simplify(requirements, opaques):
@@ -306,6 +380,7 @@ class Logic:
         /,
         optim=True,
         requirements: List[DNFInventory] | None = None,
+        verify_incremental=False,
     ):
         self.areas = areas
         self.short_to_full = areas.short_to_full
@@ -330,25 +405,60 @@ class Logic:
         self.inventory = logic_settings.full_inventory
         self.frees = logic_settings.starting_inventory
 
-        self.backup_requirements = self.requirements.copy()
+        # State for the incremental repair of full_inventory in replace_item
+        self.verify_incremental = verify_incremental
+        self.free_inventory: Inventory | None = None
+        self.dependents: Dict[EXTENDED_ITEM, Set[EXTENDED_ITEM]] | None = None
+        self.stale_bits: Set[EXTENDED_ITEM] = set()
+        # Changes whenever the requirements may have changed
+        self.requirements_version = 0
+        self._dependency_graph: DependencyGraph | None = None
+        self._dependency_graph_version = -1
 
-        for loc, req in logic_settings.runtime_requirements.items():
-            it = EXTENDED_ITEM[loc]
-            # assert self.opaque[it]
-            self.requirements[it] |= self.ban_if(loc, req)
-            if it != EVERYTHING_BIT:
-                self.opaque[it] = False
+        self.backup_requirements = self.requirements.copy()
 
-        self.shallow_simplify(self.requirements, self.opaque)
+        if requirements is None:
+            self.requirements, self.opaque = self.cached_runtime_requirements(
+                areas, self.banned, logic_settings.runtime_requirements
+            )
+        else:
+            self.apply_runtime_requirements(
+                self.requirements,
+                self.opaque,
+                logic_settings.runtime_requirements,
+                self.banned,
+            )
 
         for exit, entrance in self.placement.map_transitions.items():
             self.link_connection(exit, entrance)
 
+        # Accessible checks are tracked as bitmasks over the positions of
+        # check_list(""), so that every region keeps the same order
+        self.check_index: Dict[EIN, int] = {
+            loc: i for i, loc in enumerate(self.check_list(EIN("")))
+        }
+        self.check_bit_to_index: Dict[int, int] = {
+            self.areas.checks[loc]["req_index"]: i
+            for loc, i in self.check_index.items()
+        }
+        self.check_bits_mask = 0
+        for bit in self.check_bit_to_index:
+            self.check_bits_mask |= 1 << bit
+        self._full_inventory = EMPTY_INV
+        self._accessible_mask = 0
+        self._empty_mask = (1 << len(self.check_index)) - 1
+        for loc in self.placement.locations:
+            if loc in self.check_index:
+                self._empty_mask &= ~(1 << self.check_index[loc])
+        self._unfixed_mask = self._empty_mask
+
         self.full_inventory = self.inventory
         for k, v in self.placement.locations.items():
             self.place_item(k, v, fill=False)
 
-        pure_usefuls = self.aggregate_requirements(areas.requirements, None)
+        if (pure_usefuls := pure_usefuls_cache.get(areas)) is None:
+            pure_usefuls = self.aggregate_requirements(areas.requirements, None)
+            pure_usefuls_cache[areas] = pure_usefuls
         for it in self.banned:
             if it not in EXTENDED_ITEM:
                 continue
@@ -365,7 +475,73 @@ class Logic:
             self.shallow_simplify(self.requirements, self.opaque)
             self.fill_inventory_i(monotonic=True)
         self.backup_requirements = self.requirements.copy()
-        self.aggregate = self.aggregate_requirements(self.requirements, None)
+        self.aggregate = self.dependency_graph().aggregate()
+
+    @staticmethod
+    def apply_runtime_requirements(
+        requirements: List[DNFInventory],
+        opaque: List[bool],
+        runtime_requirements: Dict[EIN, DNFInventory],
+        banned: List[EIN],
+    ):
+        banned_bit_inv = DNFInventory(BANNED_BIT)
+        for loc, req in runtime_requirements.items():
+            it = EXTENDED_ITEM[loc]
+            # assert opaque[it]
+            requirements[it] |= req & banned_bit_inv if loc in banned else req
+            if it != EVERYTHING_BIT:
+                opaque[it] = False
+
+        Logic.shallow_simplify(requirements, opaque)
+
+    @staticmethod
+    def cached_runtime_requirements(
+        areas: Areas,
+        banned: List[EIN],
+        runtime_requirements: Dict[EIN, DNFInventory],
+    ) -> Tuple[List[DNFInventory], List[bool]]:
+        """
+        Copies of the requirements and opaques of the areas with the runtime
+        requirements applied, computed once for all the seeds sharing them
+        """
+        key = tuple(
+            (
+                loc,
+                loc in banned,
+                tuple(
+                    (conj.bitset, conj_pre.bitset)
+                    for conj, conj_pre in req.disjunction.items()
+                ),
+            )
+            for loc, req in runtime_requirements.items()
+        )
+        cache = runtime_requirements_cache.setdefault(areas, {})
+        if key not in cache:
+            requirements = areas.requirements.copy()
+            opaque = areas.opaque.copy()
+            Logic.apply_runtime_requirements(
+                requirements, opaque, runtime_requirements, banned
+            )
+            if len(cache) >= MAX_CACHED_RUNTIME_REQUIREMENTS:
+                del cache[next(iter(cache))]
+            cache[key] = requirements, opaque
+        requirements, opaque = cache[key]
+        return requirements.copy(), opaque.copy()
+
+    @property
+    def full_inventory(self) -> Inventory:
+        return self._full_inventory
+
+    @full_inventory.setter
+    def full_inventory(self, inventory: Inventory):
+        changed = (
+            self._full_inventory.bitset ^ inventory.bitset
+        ) & self.check_bits_mask
+        self._full_inventory = inventory
+        while changed:
+            low = changed & -changed
+            changed ^= low
+            self._accessible_mask ^= 1 << self.check_bit_to_index[low.bit_length() - 1]
 
     def add_item(self, item: EXTENDED_ITEM):
         self.inventory |= item
@@ -382,19 +558,74 @@ class Logic:
         self.inventory = self.inventory.remove(item)
         if Inventory(item) <= self.aggregate:
             self.fill_inventory_i()
+        else:
+            self.stale_bits.add(item)
 
     def remove_items(self, items: Iterable[EXTENDED_ITEM]):
         for item in items:
             self.inventory = self.inventory.remove(item)
         if any(item in self.aggregate.intset for item in items):
             self.fill_inventory_i()
+        else:
+            self.stale_bits.update(items)
 
     def fill_inventory_i(self, monotonic=False):
         # self.shallow_simplify()
-        self.free_simplify(self.requirements, self.frees)
-        inventory = self.full_inventory if monotonic else self.inventory
+        self.requirements_version += 1
+        self.free_inventory = self.free_simplify(self.requirements, self.frees)
+        if monotonic:
+            inventory = self.full_inventory
+        else:
+            inventory = self.inventory
+            # Requirements may have been changed from the outside
+            self.dependents = None
+            self.stale_bits.clear()
         self.full_inventory = self.fill_inventory(self.requirements, inventory)
 
+    def requirements_changed(self):
+        """Must be called after changing the requirements from the outside"""
+        self.requirements_version += 1
+
+    def dependency_graph(self) -> DependencyGraph:
+        """
+        The dependency graph of the current requirements, compiled again
+        only when they changed since the last call
+        """
+        if self._dependency_graph_version != self.requirements_version:
+            self._dependency_graph = DependencyGraph(self.requirements)
+            self._dependency_graph_version = self.requirements_version
+        return self._dependency_graph
+
+    def add_dependents(self, bit: EXTENDED_ITEM, req: DNFInventory):
+        if self.dependents is None:
+            return
+        for conj in req.disjunction:
+            for req_bit in conj.intset:
+                self.dependents[req_bit].add(bit)
+
+    def get_dependents(self) -> Dict[EXTENDED_ITEM, Set[EXTENDED_ITEM]]:
+        # A superset of the reverse requirement graph is enough, so entries
+        # are only ever added until the next non monotonic fill
+        if self.dependents is None:
+            self.dependents = defaultdict(set)
+            for bit in EXTENDED_ITEM.items():
+                self.add_dependents(bit, self.requirements[bit])
+                self.add_dependents(bit, self.backup_requirements[bit])
+        return self.dependents
+
+    def repair_inventory(self, removed: Iterable[EXTENDED_ITEM]):
+        """
+        Updates full_inventory after the bits in removed lost their requirement
+        or left the inventory, by only recomputing the bits depending on them
+        """
+        self.full_inventory = self.shrink_inventory(
+            self.requirements,
+            self.get_dependents(),
+            self.full_inventory,
+            self.inventory,
+            removed,
+        )
+
     @staticmethod
     def explore(checks, area: Area) -> Iterable[EIN]:
         def explore(area):
@@ -407,12 +638,28 @@ class Logic:
 
         return explore(area)
 
-    @cache
+    @instance_cache
     def check_list(self, placement_limit: EIN) -> List[EIN]:
         return list(
             dict.fromkeys(self.explore(self.areas.checks, self.areas[placement_limit]))
         )
 
+    @instance_cache
+    def region_mask(self, placement_limit: EIN) -> int:
+        mask = 0
+        for loc in self.check_list(placement_limit):
+            mask |= 1 << self.check_index[loc]
+        return mask
+
+    def checks_from_mask(self, mask: int) -> List[EIN]:
+        checks = self.check_list(EIN(""))
+        ret = []
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            ret.append(checks[low.bit_length() - 1])
+        return ret
+
     def accessible_checks(self, placement_limit: EIN = EIN("")) -> List[EIN]:
         if placement_limit in self.areas.checks:
             placement_limit2, loc = placement_limit.rsplit("\\", 1)
@@ -422,12 +669,28 @@ class Logic:
                 return []
             return [EIN(placement_limit)]
         else:
-            return [
-                loc
-                for loc in self.check_list(placement_limit)
-                if self.full_inventory[EXTENDED_ITEM[loc]]
-                and loc not in self.fixed_locations
-            ]
+            return self.checks_from_mask(
+                self._accessible_mask
+                & self._unfixed_mask
+                & self.region_mask(placement_limit)
+            )
+
+    def accessible_empty_checks(self, placement_limit: EIN = EIN("")) -> List[EIN]:
+        if placement_limit in self.areas.checks:
+            if placement_limit in self.placement.locations:
+                return []
+            return self.accessible_checks(placement_limit)
+        else:
+            return self.checks_from_mask(self.accessible_empty_mask(placement_limit))
+
+    def accessible_empty_mask(self, placement_limit: EIN = EIN("")) -> int:
+        """The accessible empty checks of a region, as a mask over check_index"""
+        return (
+            self._accessible_mask
+            & self._empty_mask
+            & self._unfixed_mask
+            & self.region_mask(placement_limit)
+        )
 
     def accessible_stones(self) -> Iterable[EIN]:
         for stone in self.areas.gossip_stones:
@@ -440,10 +703,14 @@ class Logic:
                 if self.full_inventory[EXTENDED_ITEM[exit]]:
                     yield exit
 
-    def link_connection(self, exit: EIN, entrance: EIN, pool=None, requirements=None):
-        allowed_times = self.entrance_allowed_time_of_day[entrance]
+    @staticmethod
+    def connection_requirements(
+        areas: Areas, exit: EIN, entrance: EIN
+    ) -> List[Tuple[EXTENDED_ITEM, DNFInventory]]:
+        """The bits of entrance, with what they require when exit leads to it"""
+        allowed_times = areas.entrance_allowed_time_of_day[entrance]
         exit_bit = EXTENDED_ITEM[exit]
-        exit_area = self.exit_to_area[exit]
+        exit_area = areas.exit_to_area[exit]
         exit_as_req = DNFInventory(exit_bit)
 
         if exit_area.abstract:
@@ -464,14 +731,17 @@ class Logic:
             night_req = exit_as_req
 
         if allowed_times == Both:
-            bit_req = [
+            return [
                 (EXTENDED_ITEM[make_day(entrance)], day_req),
                 (EXTENDED_ITEM[make_night(entrance)], night_req),
             ]
         elif allowed_times == DayOnly:
-            bit_req = [(EXTENDED_ITEM[entrance], day_req)]
+            return [(EXTENDED_ITEM[entrance], day_req)]
         else:
-            bit_req = [(EXTENDED_ITEM[entrance], night_req)]
+            return [(EXTENDED_ITEM[entrance], night_req)]
+
+    def link_connection(self, exit: EIN, entrance: EIN, pool=None, requirements=None):
+        bit_req = self.connection_requirements(self.areas, exit, entrance)
 
         if requirements is None:
             self.placement.map_transitions[exit] = entrance
@@ -481,6 +751,8 @@ class Logic:
                 req = self.ban_if(entrance, req)
                 self.requirements[bit] |= req
                 self.backup_requirements[bit] |= req
+                self.add_dependents(bit, req)
+            self.requirements_version += 1
         else:
             for bit, req in bit_req:
                 req = self.ban_if(entrance, req)
@@ -526,6 +798,8 @@ class Logic:
             req = self.ban_if(item, req)
             self.requirements[item_bit] = req
             self.backup_requirements[item_bit] = req
+            self.add_dependents(item_bit, req)
+            self.requirements_version += 1
             self.opaque[item_bit] = False
             if fill:
                 self.fill_inventory_i(monotonic=True)
@@ -535,8 +809,50 @@ class Logic:
             self.placement.stones[location].append(item)
         else:
             self.placement.locations[location] = item
+            if location in self.check_index:
+                self._empty_mask &= ~(1 << self.check_index[location])
         return True
 
+    def restorable_requirements(
+        self, old_item_bit: EXTENDED_ITEM
+    ) -> List[EXTENDED_ITEM] | None:
+        """
+        Lists the requirements that a reset to backup_requirements would change,
+        apart from the free simplifications, or returns None if the reset
+        could make more things accessible or undo free simplifications
+        """
+        if self.free_inventory is None or self.free_inventory[old_item_bit]:
+            return None
+        free_simplified = self.free_inventory - self.frees
+        restored = []
+        for bit, (req, backup) in enumerate(
+            zip(self.requirements, self.backup_requirements)
+        ):
+            if req is backup or free_simplified.bitset >> bit & 1:
+                continue
+            if not backup.is_impossible():
+                return None
+            restored.append(EXTENDED_ITEM(bit))
+        return restored
+
+    def check_incremental_state(self):
+        requirements = self.backup_requirements.copy()
+        self.free_simplify(requirements, self.frees)
+        full_inventory = self.fill_inventory(requirements, self.inventory)
+        if full_inventory != self.full_inventory:
+            raise ValueError(
+                "Incremental update of the inventory diverged from the full computation: "
+                f"missing {full_inventory - self.full_inventory}, "
+                f"extra {self.full_inventory - full_inventory}."
+            )
+        if any(
+            a.disjunction.keys() != b.disjunction.keys()
+            for a, b in zip(requirements, self.requirements)
+        ):
+            raise ValueError(
+                "Incremental update of the requirements diverged from the full computation."
+            )
+
     def replace_item(self, location: EIN, item: EIN, old_hint: EIN | None = None):
         if hint_mode := old_hint is not None:
             if location not in self.placement.stones:
@@ -556,14 +872,27 @@ class Logic:
             old_item = self.placement.locations[location]
             del self.placement.locations[location]
             del self.placement.items[old_item]
+            if location in self.check_index:
+                self._empty_mask |= 1 << self.check_index[location]
 
         if old_item in EXTENDED_ITEM:
             # We should always be in this case
             old_item_bit = EXTENDED_ITEM[old_item]
             self.opaque[old_item_bit] = True
             self.backup_requirements[old_item_bit] = DNFInventory()
-            self.requirements = self.backup_requirements.copy()
-            self.fill_inventory_i()
+            restored = self.restorable_requirements(old_item_bit)
+            if restored is None:
+                # The free simplifications may rely on the old item
+                self.requirements = self.backup_requirements.copy()
+                self.fill_inventory_i()
+            else:
+                for bit in restored:
+                    self.requirements[bit] = self.backup_requirements[bit]
+                self.requirements_version += 1
+                self.repair_inventory(restored + list(self.stale_bits))
+                self.stale_bits.clear()
+                if self.verify_incremental:
+                    self.check_incremental_state()
 
         self.place_item(location, item, hint_mode=hint_mode)
         return old_item
@@ -55,8 +55,22 @@ class DNFInventory(LogicExpression):
             inv = Inventory(v)
             self.disjunction = {inv: inv}
 
+    @property
+    def bitsets(self) -> Tuple[int, ...]:
+        """The conjunctions as bitsets, the smallest first"""
+        try:
+            return self._bitsets
+        except AttributeError:
+            self._bitsets = tuple(
+                sorted((conj.bitset for conj in self.disjunction), key=int.bit_count)
+            )
+            return self._bitsets
+
     def eval(self, inventory: Inventory):
-        return any(req_items <= inventory for req_items in self.disjunction)
+        return self.eval_bitset(inventory.bitset)
+
+    def eval_bitset(self, bitset: int):
+        return any(conj & bitset == conj for conj in self.bitsets)
 
     def localize(self, *args):
         return self
@@ -66,12 +80,14 @@ class DNFInventory(LogicExpression):
             filtered_self = self.disjunction.copy()
             filtered_other = {}
             for conj, conj_pre in other.disjunction.items():
+                bits = conj.bitset
                 to_pop = []
                 for conj2 in filtered_self:
-                    if conj <= conj2 and conj != conj2:
+                    common = bits & conj2.bitset
+                    if common == bits and bits != conj2.bitset:
                         conj_pre &= filtered_self[conj2]
                         to_pop.append(conj2)
-                    if conj2 <= conj:
+                    if common == conj2.bitset:
                         filtered_self[conj2] &= conj_pre
                         break
                 else:
@@ -1,9 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from functools import cache
-from typing import List  # Only for typing purposes
+from heapq import heapify, heappop, heappush
+from typing import Dict, List, Set, Tuple  # Only for typing purposes
 
-from .logic import Logic, Placement, LogicSettings
+from .logic import Logic, Placement, LogicSettings, instance_cache
 from .logic_input import Areas
 from .logic_expression import DNFInventory
 from .inventory import (
@@ -27,6 +27,22 @@ class AdditionalInfo:
     known_locations: List[EIN]
 
 
+@dataclass
+class UsefulnessAnalysis:
+    """
+    What the hints and the spoiler log need to know about the items of a finished seed,
+    computed once after LogicUtils.check
+    """
+
+    useful_items: Dict[EIN, None]
+    sots_items: Dict[EIN, List[EIN]]
+    sots_locations: Dict[EIN, List[Tuple[EIN, EIN, EIN]]]
+    barren_regions: List[EIN]
+    inaccessible_regions: List[EIN]
+    locations_by_hint_region: Dict[EIN, List[EIN]]
+    reachable_locations: Set[EIN]
+
+
 class LogicUtils(Logic):
     def __init__(
         self,
@@ -37,6 +53,7 @@ class LogicUtils(Logic):
         banned,
         /,
         reqs: List[DNFInventory] | None = None,
+        verify_incremental=False,
     ):
         starting_inventory = Inventory(
             {EXTENDED_ITEM[itemname] for itemname in placement.starting_items}
@@ -44,8 +61,16 @@ class LogicUtils(Logic):
         settings = LogicSettings(
             starting_inventory, EMPTY_INV, runtime_requirements, banned
         )
-        super().__init__(areas, settings, placement, optim=False, requirements=reqs)
+        super().__init__(
+            areas,
+            settings,
+            placement,
+            optim=False,
+            requirements=reqs,
+            verify_incremental=verify_incremental,
+        )
         self.full_inventory = Logic.get_everything_unbanned(self.requirements)
+        self.requirements_changed()
         self.required_dungeons = additional_info.required_dungeons
         self.unrequired_dungeons = additional_info.unrequired_dungeons
         self.known_locations = additional_info.known_locations
@@ -77,14 +102,31 @@ class LogicUtils(Logic):
                 f"Item {item} has not been handled by the randomizer."
             )
 
-    @cache
+    @instance_cache
     def _fill_for_test(self, banned_intset, inventory):
+        if not banned_intset:
+            return Logic.fill_inventory(self.requirements, inventory)
+
+        # Restricted fills are only a subset of the unrestricted one, so they are
+        # derived from it by removing what depends on the banned bits
         custom_requirements = self.requirements.copy()
+        banned = []
         for index, e in enumerate(reversed(bin(banned_intset))):
             if e == "1":
                 custom_requirements[index] = DNFInventory(False)
+                banned.append(EXTENDED_ITEM(index))
+
+        return Logic.shrink_inventory(
+            custom_requirements,
+            self.get_dependents(),
+            self._current_fill(inventory, self.requirements_version),
+            inventory,
+            banned,
+        )
 
-        return Logic.fill_inventory(custom_requirements, inventory)
+    @instance_cache
+    def _current_fill(self, inventory, requirements_version):
+        return Logic.fill_inventory(self.requirements, inventory)
 
     def fill_restricted(
         self,
@@ -144,7 +186,7 @@ class LogicUtils(Logic):
 
         return aggregate
 
-    @cache
+    @instance_cache
     def _get_sots_items(self, index: EXTENDED_ITEM):
         usefuls = self.get_useful_items(index)
         return [
@@ -185,11 +227,9 @@ class LogicUtils(Logic):
             hint_region = self.areas.checks[sots_loc]["hint_region"]
             yield (hint_region, sots_loc, item)
 
-    @cache
+    @instance_cache
     def _get_useful_items(self, index: EXTENDED_ITEM):
-        usefuls = self.aggregate_requirements(
-            self.requirements, self.full_inventory, index
-        )
+        usefuls = self.dependency_graph().closure(index, self.full_inventory)
         return [
             loc
             for i in usefuls.intset
@@ -199,11 +239,11 @@ class LogicUtils(Logic):
     def get_useful_items(self, bit=EVERYTHING_UNBANNED_BIT):
         return self._get_useful_items(bit)
 
-    @cache
+    @instance_cache
     def locations_by_hint_region(self, region):
         return [n for n, c in self.areas.checks.items() if c["hint_region"] == region]
 
-    @cache
+    @instance_cache
     def _get_barren_regions(self, index: EXTENDED_ITEM):
         useful_checks = (
             loc
@@ -236,35 +276,97 @@ class LogicUtils(Logic):
     def get_barren_regions(self, bit=EVERYTHING_UNBANNED_BIT):
         return self._get_barren_regions(bit)
 
+    @instance_cache
     def calculate_playthrough_progression_spheres(self):
-        spheres = []
-        inventory = self.inventory | HINT_BYPASS_BIT
-        inventory2 = inventory
+        """
+        Gives the same spheres as sweeping over all the requirements until nothing
+        changes, but only evaluates again the requirements that depend on a newly
+        obtained bit, in the order the sweeps would have reached them
+        """
         requirements = self.backup_requirements
-        usefuls = self.get_useful_items()
+        dependents: List[Set[int]] = [set() for _ in requirements]
+        conjunctions: List[List[int]] = []
+        for bit, req in enumerate(requirements):
+            conjunctions.append([conj.bitset for conj in req.disjunction])
+            for conj in req.disjunction:
+                for req_bit in conj.intset:
+                    dependents[req_bit].add(bit)
+
+        demise_bit = EXTENDED_ITEM[self.short_to_full(DEMISE)]
+        useful_bits = {EXTENDED_ITEM[item] for item in self.get_useful_items()}
+
+        spheres = []
+        inventory = (self.inventory | HINT_BYPASS_BIT).bitset
+        obtained = inventory
+        to_check = list(range(len(requirements)))
         while True:
             sphere = []
-            keep_going = True
-            while keep_going:
-                keep_going = False
-                for i in EXTENDED_ITEM.items():
-                    if not inventory2[i] and requirements[i].eval(inventory):
-                        keep_going = True
-                        inventory2 |= i
-                        if (item := EXTENDED_ITEM.get_item_name(i)) in usefuls:
-                            loc = self.placement.items[item]
-                            sphere.append(loc)
-                        elif i == EXTENDED_ITEM[self.short_to_full(DEMISE)]:
-                            sphere.append(DEMISE)
-                        else:
-                            inventory |= i
-            inventory = inventory2
+            new_bits = []
+            sweep, next_sweep = to_check, []
+            heapify(sweep)
+            while sweep:
+                last = -1
+                while sweep:
+                    bit = heappop(sweep)
+                    if bit == last or obtained >> bit & 1:
+                        continue
+                    last = bit
+                    if not any(conj & inventory == conj for conj in conjunctions[bit]):
+                        continue
+                    obtained |= 1 << bit
+                    if bit in useful_bits:
+                        item = EXTENDED_ITEM.get_item_name(EXTENDED_ITEM(bit))
+                        sphere.append(self.placement.items[item])
+                        new_bits.append(bit)
+                    elif bit == demise_bit:
+                        sphere.append(DEMISE)
+                        new_bits.append(bit)
+                    else:
+                        inventory |= 1 << bit
+                        # Later bits are still reached in this sweep
+                        for dep in dependents[bit]:
+                            heappush(sweep if dep > bit else next_sweep, dep)
+                sweep, next_sweep = next_sweep, []
+            inventory = obtained
             if sphere:
                 spheres.append(sphere)
             else:
                 break
+            to_check = [dep for bit in new_bits for dep in dependents[bit]]
         return spheres
 
+    def analyse_usefulness(self) -> UsefulnessAnalysis:
+        goals = [DEMISE] + [DUNGEON_GOALS[dun] for dun in self.required_dungeons]
+        goal_bits = {
+            goal: EXTENDED_ITEM[self.short_to_full(GOAL_CHECKS[goal])] for goal in goals
+        }
+
+        by_hint_region = {region: [] for region in ALL_HINT_REGIONS}
+        for loc, check in self.areas.checks.items():
+            by_hint_region.setdefault(check["hint_region"], []).append(loc)
+
+        not_banned = self.fill_restricted()
+        barren_regions, inaccessible_regions = self.get_barren_regions()
+
+        return UsefulnessAnalysis(
+            useful_items=dict.fromkeys(self.get_useful_items()),
+            sots_items={
+                goal: self.get_sots_items(bit) for goal, bit in goal_bits.items()
+            },
+            sots_locations={
+                goal: list(self.get_sots_locations(bit))
+                for goal, bit in goal_bits.items()
+            },
+            barren_regions=barren_regions,
+            inaccessible_regions=inaccessible_regions,
+            locations_by_hint_region=by_hint_region,
+            reachable_locations={
+                loc
+                for loc, check in self.areas.checks.items()
+                if not_banned[check["req_index"]]
+            },
+        )
+
     def get_dowsing(self, dowsing_setting):
         # Get info for which dowsing slot (if any) a chest should respond to.
         # Dowsing slots:
@@ -0,0 +1,216 @@
+from __future__ import annotations
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+import hashlib
+import json
+import os
+
+from .constants import *
+from paths import PATCH_AREAS_TABLE_PATH
+from version import VERSION
+import yaml_files
+
+# Keys of the areas tables that only make sense along with the logic
+LOGIC_ONLY_KEYS = ("req_index", "allowed_time_of_day")
+
+
+class PatchAreas:
+    """
+    The part of the areas the GamePatcher and placement files use:
+    the check, gossip stone and entrance metadata, and the short names.
+    It can be loaded from a precompiled table without parsing the requirements,
+    so that patching a known placement doesn't need to build the whole Areas.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[EIN, dict],
+        gossip_stones: Dict[EIN, dict],
+        map_exits: Dict[EIN, dict],
+        map_entrances: Dict[EIN, dict],
+        short_full: List[Tuple[str, EIN]],
+        area_tree: Dict[str, Tuple[Dict[str, str], List[str]]],
+    ):
+        self.checks = checks
+        self.gossip_stones = gossip_stones
+        self.map_exits = map_exits
+        self.map_entrances = map_entrances
+        self.short_full = dict(short_full)
+        self.full_short = {full: short for short, full in short_full}
+        # Name of each area: the names of its sub-areas by key, and the
+        # names of its locations, entrances and map exits
+        self.area_tree = area_tree
+
+    @classmethod
+    def from_areas(cls, areas) -> PatchAreas:
+        def strip(table: Dict[EIN, dict]) -> Dict[EIN, dict]:
+            return {
+                name: {k: v for k, v in entry.items() if k not in LOGIC_ONLY_KEYS}
+                for name, entry in table.items()
+            }
+
+        short_full = list(areas.short_full)
+        for table in (
+            areas.checks,
+            areas.gossip_stones,
+            areas.map_exits,
+            areas.map_entrances,
+        ):
+            short_full.extend(
+                (entry["short_name"], name) for name, entry in table.items()
+            )
+
+        area_tree = {}
+        # The root of the search shares its name with the root of the requirements
+        for area in (*areas.areas.values(), areas.all_areas):
+            area_tree[area.name] = (
+                {k: sub_area.name for k, sub_area in area.sub_areas.items()},
+                [
+                    *area.locations,
+                    *area.entrances,
+                    *(e for e in area.exits if e in areas.map_exit_suffixes),
+                ],
+            )
+
+        return cls(
+            strip(areas.checks),
+            strip(areas.gossip_stones),
+            strip(areas.map_exits),
+            strip(areas.map_entrances),
+            short_full,
+            area_tree,
+        )
+
+    def to_table(self, key: str) -> dict:
+        return {
+            "key": key,
+            "checks": self.checks,
+            "gossip-stones": self.gossip_stones,
+            "map-exits": self.map_exits,
+            "map-entrances": self.map_entrances,
+            "short-full": list(self.short_full.items()),
+            "area-tree": self.area_tree,
+        }
+
+    @classmethod
+    def from_table(cls, table: dict) -> PatchAreas:
+        return cls(
+            table["checks"],
+            table["gossip-stones"],
+            table["map-exits"],
+            table["map-entrances"],
+            [(short, EIN(full)) for short, full in table["short-full"]],
+            {
+                area: (sub_areas, leaves)
+                for area, (sub_areas, leaves) in table["area-tree"].items()
+            },
+        )
+
+    def short_to_full(self, elt: str) -> EIN:
+        if elt not in self.short_full:
+            self.short_full[elt] = self.search(elt)
+        return self.short_full[elt]
+
+    def search(self, partial_address_str: str) -> EIN:
+        """Same as Areas.search from the root, on the area tree of the table"""
+        queue: Deque[str] = deque([""])
+        partial_address = partial_address_str.split(" - ")
+        j = 0
+        if partial_address[0] == "General":
+            j = 1
+
+        head = partial_address[j]
+        while queue:
+            area = queue.popleft()
+            sub_areas, leaves = self.area_tree[area]
+            if j == len(partial_address):
+                return EIN(area)
+
+            if j + 1 == len(partial_address) and head in leaves:
+                return with_sep_full(area, head)
+
+            if head in sub_areas:  # Abandon the base address, we've branched off
+                if j + 1 == len(partial_address):
+                    return EIN(sub_areas[head])
+                queue.clear()
+                queue.append(sub_areas[head])
+                j += 1
+                head = partial_address[j]
+                continue
+
+            # Now we search everywhere
+            queue.extend(sub_areas.values())
+        else:
+            raise ValueError(f"Could not find '{partial_address_str}' from ''.")
+
+    def full_to_short(self, elt: EIN) -> str:
+        if elt not in self.full_short:
+            raise ValueError(f"Error: association list, cannot find {elt}.")
+        return self.full_short[elt]
+
+    def prettify(self, s):
+        if s in ALL_ITEM_NAMES:
+            return strip_item_number(s)
+        for table in (
+            self.checks,
+            self.gossip_stones,
+            self.map_exits,
+            self.map_entrances,
+        ):
+            if s in table:
+                return table[s]["short_name"]
+        if "\\" not in s and "#" not in s:
+            return s
+        raise ValueError(f"Can't find a shortname for {s}.")
+
+
+def get_patch_areas_key() -> str:
+    """Changes with the version and with every file the areas are built from"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(VERSION.encode("utf-8"))
+    files = [
+        yaml_files.checks_file,
+        yaml_files.hints_file,
+        yaml_files.map_exits_file,
+    ] + [
+        yaml_files.requirements_folder / filename
+        for filename in sorted(os.listdir(yaml_files.requirements_folder))
+        if filename.endswith(".yaml")
+    ]
+    for file in files:
+        digest.update(file.name.encode("utf-8"))
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def get_patch_areas(areas=None) -> PatchAreas:
+    """
+    Loads the patch areas from the precompiled table, rebuilding the table
+    (from areas if given) when it is missing or out of date
+    """
+    key = get_patch_areas_key()
+    try:
+        with PATCH_AREAS_TABLE_PATH.open("r", encoding="utf-8") as f:
+            table = json.load(f)
+        if table["key"] == key:
+            return PatchAreas.from_table(table)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    if areas is None:
+        from .logic_input import Areas
+
+        areas = Areas(
+            yaml_files.requirements,
+            yaml_files.checks,
+            yaml_files.hints,
+            yaml_files.map_exits,
+        )
+    patch_areas = PatchAreas.from_areas(areas)
+    try:
+        PATCH_AREAS_TABLE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with PATCH_AREAS_TABLE_PATH.open("w", encoding="utf-8") as f:
+            json.dump(patch_areas.to_table(key), f)
+    except OSError as e:
+        print(f"Could not write the patch areas table: {e}")
+    return patch_areas
@@ -1,8 +1,27 @@
 from .constants import *
+from .logic_input import Areas
 from options import Options
 from version import VERSION
 
+from array import array
+from typing import Dict, Iterable, List
+from weakref import WeakKeyDictionary
+import hashlib
 import json
+import sys
+import zlib
+
+# Binary placement files:
+# magic, format version, flags, digest (16 bytes), then the payload,
+# compressed with zlib if FLAG_ZLIB is set.
+# Lists of names are stored as arrays of indices into the vocabulary of the
+# areas (1-based), followed by the names whose index is 0 as they are not in it.
+BINARY_MAGIC = b"SSPF"
+BINARY_FORMAT_VERSION = 1
+FLAG_ZLIB = 1
+DIGEST_SIZE = 16
+
+vocabulary_cache: WeakKeyDictionary[Areas, Dict[str, int]] = WeakKeyDictionary()
 
 
 class InvalidPlacementFile(Exception):
@@ -24,6 +43,9 @@ class PlacementFile:
         self.trial_object_seed = -1
         self.music_rando_seed = -1
         self.bk_angle_seed = -1
+        # Set when read from a binary file written by this version
+        # from a valid placement file for the same areas
+        self.prevalidated = False
 
     def read_from_file(self, f):
         self._read_from_json(json.load(f))
@@ -63,9 +85,88 @@ class PlacementFile:
         self.music_rando_seed = jsn["music-rando-seed"]
         self.bk_angle_seed = jsn["bk-angle-seed"]
 
+    def to_binary(self, areas: Areas, compress=True) -> bytes:
+        """Compact encoding of the placement file, which must be valid for areas"""
+        self.check_valid(areas)
+        vocabulary = get_vocabulary(areas)
+        writer = BinaryWriter(vocabulary)
+        writer.string(self.version)
+        writer.string(self.options.get_permalink(exclude_seed=True))
+        writer.string(self.hash_str)
+        writer.names(self.starting_items)
+        writer.names(self.required_dungeons)
+        writer.names(self.item_locations.keys())
+        writer.names(self.item_locations.values())
+        writer.names(self.chest_dowsing.keys())
+        writer.small_ints(self.chest_dowsing.values())
+        writer.names(self.hints.keys())
+        for hintlist in self.hints.values():
+            writer.varint(len(hintlist))
+            for hint in hintlist:
+                writer.string(hint)
+        writer.names(self.map_connections.keys())
+        writer.names(self.map_connections.values())
+        for seed in (self.trial_object_seed, self.music_rando_seed, self.bk_angle_seed):
+            writer.signed_varint(seed)
+
+        payload = bytes(writer.data)
+        flags = 0
+        if compress:
+            flags |= FLAG_ZLIB
+            payload = zlib.compress(payload, 9)
+        header = BINARY_MAGIC + bytes([BINARY_FORMAT_VERSION, flags])
+        return header + binary_digest(vocabulary, payload) + payload
+
+    @staticmethod
+    def is_binary(data: bytes) -> bool:
+        return data.startswith(BINARY_MAGIC)
+
+    def read_from_binary(self, data: bytes, areas: Areas):
+        if not self.is_binary(data):
+            raise InvalidPlacementFile("Not a binary placement file.")
+        position = len(BINARY_MAGIC)
+        format_version, flags = data[position], data[position + 1]
+        if format_version != BINARY_FORMAT_VERSION:
+            raise InvalidPlacementFile(
+                f"Unknown binary placement file format {format_version}."
+            )
+        position += 2
+        digest = data[position : position + DIGEST_SIZE]
+        payload = data[position + DIGEST_SIZE :]
+
+        vocabulary = get_vocabulary(areas)
+        try:
+            reader = BinaryReader(
+                zlib.decompress(payload) if flags & FLAG_ZLIB else payload,
+                [None, *vocabulary],
+            )
+            self.version = reader.string()
+            self.options.update_from_permalink(reader.string())
+            self.options.set_option("seed", -1)
+            self.hash_str = reader.string()
+            self.starting_items = reader.names()
+            self.required_dungeons = reader.names()
+            self.item_locations = dict(zip(reader.names(), reader.names()))
+            self.chest_dowsing = dict(zip(reader.names(), reader.small_ints()))
+            self.hints = {
+                hintloc: [reader.string() for _ in range(reader.varint())]
+                for hintloc in reader.names()
+            }
+            self.map_connections = dict(zip(reader.names(), reader.names()))
+            self.trial_object_seed = reader.signed_varint()
+            self.music_rando_seed = reader.signed_varint()
+            self.bk_angle_seed = reader.signed_varint()
+        except (IndexError, UnicodeDecodeError, zlib.error) as e:
+            raise InvalidPlacementFile(f"Truncated or corrupted placement file: {e}")
+
+        self.prevalidated = digest == binary_digest(vocabulary, payload)
+
     def check_valid(self, areas):
         """checks, if the current state is valid, throws an exception otherwise
         This does not check consistency with all the settings"""
+        if self.prevalidated:
+            return
+
         if VERSION != self.version:
             raise InvalidPlacementFile(
                 f"Version did not match, requires {self.version} but found {VERSION}."
@@ -126,6 +227,119 @@ class PlacementFile:
                     )
 
 
+def get_vocabulary(areas: Areas) -> Dict[str, int]:
+    """The names binary placement files refer to by index, with their index"""
+    if (vocabulary := vocabulary_cache.get(areas)) is None:
+        names = dict.fromkeys(
+            [
+                *areas.checks,
+                *sorted(ALL_ITEM_NAMES),
+                *areas.map_exits,
+                *areas.map_entrances,
+                *areas.gossip_stones,
+                FI_HINTS_KEY,
+                *SONG_HINTS,
+                *ALL_DUNGEONS,
+            ]
+        )
+        vocabulary = vocabulary_cache[areas] = {
+            name: i for i, name in enumerate(names, start=1)
+        }
+    return vocabulary
+
+
+def binary_digest(vocabulary: Dict[str, int], payload: bytes) -> bytes:
+    """Only matches for the version and vocabulary the payload was written with"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(VERSION.encode("utf-8"))
+    digest.update("\0".join(vocabulary).encode("utf-8"))
+    digest.update(payload)
+    return digest.digest()
+
+
+class BinaryWriter:
+    def __init__(self, vocabulary: Dict[str, int]):
+        self.vocabulary = vocabulary
+        self.data = bytearray()
+
+    def varint(self, value: int):
+        while value >= 0x80:
+            self.data.append(value & 0x7F | 0x80)
+            value >>= 7
+        self.data.append(value)
+
+    def signed_varint(self, value: int):
+        self.varint(value << 1 if value >= 0 else (-value << 1) - 1)
+
+    def string(self, value: str):
+        encoded = value.encode("utf-8")
+        self.varint(len(encoded))
+        self.data += encoded
+
+    def names(self, values: Iterable[str]):
+        """Indices as little-endian 16 bits integers, then the names not in the vocabulary"""
+        values = list(values)
+        indices = array("H", (self.vocabulary.get(value, 0) for value in values))
+        self.varint(len(indices))
+        unknown = [value for value, index in zip(values, indices) if not index]
+        if sys.byteorder != "little":
+            indices.byteswap()
+        self.data += indices.tobytes()
+        for value in unknown:
+            self.string(value)
+
+    def small_ints(self, values: Iterable[int]):
+        small_ints = bytes(values)
+        self.varint(len(small_ints))
+        self.data += small_ints
+
+
+class BinaryReader:
+    def __init__(self, data: bytes, vocabulary: List[str | None]):
+        self.data = data
+        self.position = 0
+        self.vocabulary = vocabulary
+
+    def take(self, length: int) -> bytes:
+        if self.position + length > len(self.data):
+            raise IndexError("reading past the end of the data")
+        value = self.data[self.position : self.position + length]
+        self.position += length
+        return value
+
+    def varint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.data[self.position]
+            self.position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def signed_varint(self) -> int:
+        value = self.varint()
+        return -((value + 1) >> 1) if value & 1 else value >> 1
+
+    def string(self) -> str:
+        return self.take(self.varint()).decode("utf-8")
+
+    def names(self) -> List[str]:
+        indices = array("H")
+        indices.frombytes(self.take(2 * self.varint()))
+        if sys.byteorder != "little":
+            indices.byteswap()
+        names = [self.vocabulary[index] for index in indices]
+        for i, index in enumerate(indices):
+            if not index:
+                names[i] = self.string()
+        return names
+
+    def small_ints(self) -> List[int]:
+        return list(self.take(self.varint()))
+
+
 def check_sets_equal(orig: set, actual: set, name: str):
     if orig != actual:
         additional = actual - orig
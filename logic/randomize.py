@@ -10,6 +10,7 @@ from .front_fill import FrontFill
 from .assumed_fill import AssumedFill
 from .fill_algo_common import RandomizationSettings, UserOutput
 from .entrance_rando import EROptions, EntranceRando
+from .feasibility import check_placement_capacity
 from .logic import Logic, Placement, LogicSettings
 from .logic_utils import AdditionalInfo, LogicUtils
 from .logic_input import Areas
@@ -27,7 +28,12 @@ from .pools import *
 
 class Rando:
     def __init__(
-        self, areas: Areas, options: Options, rng: random.Random, useroutput: UserOutput
+        self,
+        areas: Areas,
+        options: Options,
+        rng: random.Random,
+        useroutput: UserOutput,
+        fill_algorithm: str = "Assumed Fill",
     ):
         self.options = options
         self.rng = rng
@@ -40,9 +46,15 @@ class Rando:
         self.placement: Placement = placement if placement is not None else Placement()
         self.parse_options()
         self.initial_placement = self.placement.copy()
+        check_placement_capacity(
+            self.areas,
+            self.placement,
+            self.randosettings,
+            useroutput,
+            self.dungeon_reward_locations,
+        )
 
-        # since it's currently not configurable on the UI, use assumed fill
-        fill_algorithm = "Assumed Fill"  # self.options["fill-algorithm"]
+        # since it's currently not configurable on the UI, assumed fill is the default
         if fill_algorithm == "Assumed Fill":
             start_inventory = Inventory(
                 {
@@ -110,11 +122,23 @@ class Rando:
         )
 
         self.entrance_rando = EntranceRando(
-            areas, self.rng, self.placement, useroutput, eroptions
+            areas,
+            self.rng,
+            self.placement,
+            useroutput,
+            eroptions,
+            runtime_requirements,
+            self.banned,
         )
         self.entrance_rando.randomize()
 
-        logic = Logic(areas, logic_settings, self.placement)
+        verify_incremental = self.options["verify-incremental-logic"]
+        logic = Logic(
+            areas,
+            logic_settings,
+            self.placement,
+            verify_incremental=verify_incremental,
+        )
 
         self.rando_algo = FillAlgorithm(logic, self.rng, useroutput, self.randosettings)
 
@@ -129,6 +153,7 @@ class Rando:
                 additional_info,
                 runtime_requirements,
                 self.banned,
+                verify_incremental=verify_incremental,
             )
 
         self.extract_hint_logic = fun
@@ -387,6 +412,8 @@ class Rando:
 
         self.placement |= SINGLE_CRYSTAL_PLACEMENT(self.norm, self.areas.checks)
 
+        # Depends on the required dungeons
+        self.dungeon_reward_locations: List[EIN] = []
         sword_reward_mode = self.options["sword-dungeon-reward"]
         if sword_reward_mode != "None":
             swords_to_place = [
@@ -408,6 +435,7 @@ class Rando:
             self.rng.shuffle(dungeons)
             for dungeon, sword in zip(dungeons, swords_to_place):
                 final_check = self.short_to_full(checks_to_use[dungeon])
+                self.dungeon_reward_locations.append(final_check)
                 self.placement |= Placement(
                     items={sword: final_check},
                     locations={final_check: sword},
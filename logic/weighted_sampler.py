@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import List
+import random  # Only for typing purposes
+
+
+class WeightedSampler:
+    """
+    Samples slots according to weights of the form constant + slope * time,
+    time being given when sampling. The weights are stored in a Fenwick tree,
+    so that updating a weight and sampling both take O(log(size)).
+    Sampling draws the same slot as rng.choices would over the slots in order.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.constants: List[int] = [0] * size
+        self.slopes: List[int] = [0] * size
+        # 1-indexed, node i holds the sums of the slots (i - (i & -i), i]
+        self.tree_constants: List[int] = [0] * (size + 1)
+        self.tree_slopes: List[int] = [0] * (size + 1)
+        self.top = 1 << size.bit_length() >> 1
+
+    def set_weight(self, slot: int, constant: int, slope: int = 0):
+        """A slot with a weight of 0 is never sampled"""
+        delta_constant = constant - self.constants[slot]
+        delta_slope = slope - self.slopes[slot]
+        self.constants[slot] = constant
+        self.slopes[slot] = slope
+        i = slot + 1
+        while i <= self.size:
+            self.tree_constants[i] += delta_constant
+            self.tree_slopes[i] += delta_slope
+            i += i & -i
+
+    def total(self, time: int = 0) -> int:
+        constant = slope = 0
+        i = self.size
+        while i:
+            constant += self.tree_constants[i]
+            slope += self.tree_slopes[i]
+            i &= i - 1
+        return constant + slope * time
+
+    def sample(self, rng: random.Random, time: int = 0) -> int:
+        """The weights at time must be non negative, and not all 0"""
+        total = self.total(time)
+        if total <= 0:
+            raise ValueError("Total of weights must be greater than zero")
+        x = rng.random() * total
+        # Finds the last prefix of the slots whose sum is at most x,
+        # comparing the integer sums to x without rounding
+        pos = cumul = 0
+        step = self.top
+        while step:
+            i = pos + step
+            if i <= self.size:
+                weight = self.tree_constants[i] + self.tree_slopes[i] * time
+                if cumul + weight <= x:
+                    pos = i
+                    cumul += weight
+            step >>= 1
+        return pos
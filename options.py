@@ -1,13 +1,112 @@
-from packedbits import PackedBitsReader, PackedBitsWriter
 from pathlib import Path
 from yaml_files import checks, options
 
-from collections import OrderedDict
+from collections import Counter, OrderedDict
+import base64
 
 OPTIONS = OrderedDict((option["command"], option) for option in options)
 OPTIONS["excluded-locations"]["choices"] = [check for check in checks]
 
 
+class PermalinkSchema:
+    """
+    Where each option is in the permalink, computed once from the options.
+    The permalink is the base64 of a little-endian integer, each option
+    taking the bits [offset, offset + width) of it:
+    - booleans one bit
+    - ints and singlechoices (as the index of the choice) their number of bits
+    - multichoices one bit per choice, set if it is chosen. For starting-items,
+      whose choices repeat the progressive items, the bit of the n-th copy of
+      an item is set if at least n copies are chosen.
+    This is the layout of the permalinks once written one bit at a time.
+    """
+
+    def __init__(self, options: OrderedDict):
+        # (option name, type, offset, width)
+        self.fields = []
+        # The index of each choice, the first one for repeated choices
+        self.choice_indices = {}
+        # How many times each choice is repeated, for starting-items
+        self.choice_counts = {}
+        offset = 0
+        for option_name, option in options.items():
+            if option["type"] in ("singlechoice", "multichoice"):
+                indices = {}
+                for i, choice in enumerate(option["choices"]):
+                    indices.setdefault(choice, i)
+                self.choice_indices[option_name] = indices
+                self.choice_counts[option_name] = Counter(option["choices"])
+            if not option.get("permalink", True):
+                continue
+            if option["type"] == "boolean":
+                width = 1
+            elif option["type"] in ("int", "singlechoice"):
+                width = option["bits"]
+            elif option["type"] == "multichoice":
+                width = len(option["choices"])
+            else:
+                raise Exception(f'Unknown type: {option["type"]}.')
+            self.fields.append((option_name, option["type"], offset, width))
+            offset += width
+        self.bit_count = offset
+
+    def encode(self, values: dict) -> str:
+        packed = 0
+        for option_name, option_type, offset, width in self.fields:
+            value = values.get(option_name, OPTIONS[option_name]["default"])
+            if option_type == "boolean":
+                bits = int(value)
+            elif option_type == "int":
+                bits = value & ((1 << width) - 1)
+            elif option_type == "singlechoice":
+                bits = self.choice_indices[option_name][value]
+            elif option_name == "starting-items":
+                indices = self.choice_indices[option_name]
+                choice_counts = self.choice_counts[option_name]
+                bits = 0
+                for choice, count in Counter(value).items():
+                    if (index := indices.get(choice)) is not None:
+                        count = min(count, choice_counts[choice])
+                        bits |= ((1 << count) - 1) << index
+            else:
+                indices = self.choice_indices[option_name]
+                bits = 0
+                for choice in value:
+                    if (index := indices.get(choice)) is not None:
+                        bits |= 1 << index
+            packed |= bits << offset
+        # The last byte is always followed by a flushed, possibly empty, one
+        data = packed.to_bytes(self.bit_count // 8 + 1, "little")
+        return base64.b64encode(data).decode("ascii")
+
+    def decode(self, permalink: str) -> dict:
+        data = base64.b64decode(permalink.encode("ascii"))
+        if len(data) * 8 < self.bit_count:
+            raise IndexError("Permalink is too short.")
+        packed = int.from_bytes(data, "little")
+        values = {}
+        for option_name, option_type, offset, width in self.fields:
+            bits = packed >> offset & ((1 << width) - 1)
+            if option_type == "boolean":
+                values[option_name] = bool(bits)
+            elif option_type == "int":
+                values[option_name] = bits
+            elif option_type == "singlechoice":
+                values[option_name] = OPTIONS[option_name]["choices"][bits]
+            else:
+                choices = OPTIONS[option_name]["choices"]
+                value = []
+                while bits:
+                    low_bit = bits & -bits
+                    value.append(choices[low_bit.bit_length() - 1])
+                    bits ^= low_bit
+                values[option_name] = value
+        return values
+
+
+PERMALINK_SCHEMA = PermalinkSchema(OPTIONS)
+
+
 class Options:
     def __init__(self):
         self.options = OrderedDict()
@@ -46,7 +145,8 @@ class Options:
             value = [v.strip() for v in value_str.split(",")]
             # skip out empty string
             value = [v for v in value if v]
-            unknown_values = [v for v in value if not v in option["choices"]]
+            choice_indices = PERMALINK_SCHEMA.choice_indices[option["command"]]
+            unknown_values = [v for v in value if not v in choice_indices]
             if len(unknown_values) > 0:
                 validation_errors.append(
                     f'Unknown choice(s) for {option["command"]}: {unknown_values}'
@@ -62,7 +162,7 @@ class Options:
                     return value_str, validation_errors
             else:
                 value = value_str
-            if not value in option["choices"]:
+            if not value in PERMALINK_SCHEMA.choice_indices[option["command"]]:
                 validation_errors.append(
                     f'value {value} is not valid for {option["command"]}'
                 )
@@ -94,41 +194,7 @@ class Options:
         return problems
 
     def get_permalink(self, exclude_seed=False):
-        writer = PackedBitsWriter()
-        for option_name, option in OPTIONS.items():
-            if not option.get("permalink", True):
-                continue
-            value = self.options.get(option_name, option["default"])
-            if option["type"] == "boolean":
-                # one bit
-                writer.write(int(value), 1)
-            elif option["type"] == "int":
-                # needs information, how many bits this number is
-                writer.write(value, option["bits"])
-            elif option_name == "starting-items":
-                starting_items = option["choices"].copy()
-                while len(starting_items) > 0:
-                    starting_item_count = value.count(starting_items[0])
-                    if starting_item_count == 0:
-                        writer.write(0, 1)
-                        starting_items.remove(starting_items[0])
-                    else:
-                        for progressive_count in range(
-                            starting_items.count(starting_items[0])
-                        ):
-                            writer.write(progressive_count < starting_item_count, 1)
-                            starting_items.pop(0)
-            elif option["type"] == "multichoice":
-                # as many bits as choices
-                for choice in option["choices"]:
-                    writer.write(int(choice in value), 1)
-            elif option["type"] == "singlechoice":
-                # needs information, how many bits this number is, then it's just the index to the choices
-                writer.write(option["choices"].index(value), option["bits"])
-            else:
-                raise Exception(f'Unknown type: {option["type"]}.')
-        writer.flush()
-        permalink = writer.to_base64()
+        permalink = PERMALINK_SCHEMA.encode(self.options)
         if self["seed"] != -1 and not exclude_seed:
             permalink += "#" + str(self["seed"])
         return permalink
@@ -163,7 +229,8 @@ class Options:
                 raise TypeError(
                     f"Value for option {option_name} has to be a list, got {type(option_value)}."
                 )
-            unknown_values = [v for v in option_value if not v in option["choices"]]
+            choice_indices = PERMALINK_SCHEMA.choice_indices[option_name]
+            unknown_values = [v for v in option_value if not v in choice_indices]
             if unknown_values:
                 raise ValueError(
                     f"Unknown choice(s) for {option_name}: {unknown_values}."
@@ -171,7 +238,7 @@ class Options:
         elif option["type"] == "singlechoice":
             if isinstance(option["default"], int) and not isinstance(option_value, int):
                 option_value = int(option_value)
-            if not option_value in option["choices"]:
+            if not option_value in PERMALINK_SCHEMA.choice_indices[option_name]:
                 raise ValueError(f"Unknown choice for {option_name}: {option_value}.")
         elif option["type"] == "dirpath":
             path = Path(option_value).expanduser()
@@ -204,24 +271,7 @@ class Options:
             # includes the seed as well
             permalink, seed_str = permalink.split("#", 1)
             self.set_option("seed", int(seed_str))
-        reader = PackedBitsReader.from_base64(permalink)
-        for option_name, option in OPTIONS.items():
-            if not option.get("permalink", True):
-                continue
-            if option["type"] == "boolean":
-                value = bool(reader.read(1))
-            elif option["type"] == "int":
-                value = reader.read(option["bits"])
-            elif option["type"] == "multichoice":
-                # as many bits as choices
-                value = []
-                for choice in option["choices"]:
-                    if reader.read(1):
-                        value.append(choice)
-            elif option["type"] == "singlechoice":
-                value = option["choices"][reader.read(option["bits"])]
-            else:
-                raise Exception(f'Unknown type: {option["type"]}.')
+        for option_name, value in PERMALINK_SCHEMA.decode(permalink).items():
             self.set_option(option_name, value)
 
     def to_dict(self, exclude_nonperma=False, exclude=[]):
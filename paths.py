@@ -12,3 +12,6 @@ try:
 except ImportError:
     RANDO_ROOT_PATH = Path(os.path.dirname(os.path.realpath(__file__)))
     IS_RUNNING_FROM_SOURCE = True
+
+# Precompiled metadata of the areas, to patch a known placement without building them
+PATCH_AREAS_TABLE_PATH = Path("cache") / "patch_areas.json"
@@ -1,11 +1,18 @@
 from collections import OrderedDict
 import sys
 import argparse
+import multiprocessing
 from logic.logic_input import Areas
-from yaml_files import requirements, checks, hints, map_exits
 
-from ssrando import Randomizer, PlandoRandomizer, VERSION
+from ssrando import (
+    Randomizer,
+    PlandoRandomizer,
+    GenerationFailed,
+    SettingsInfeasible,
+    VERSION,
+)
 from logic.placement_file import PlacementFile
+from logic.patch_areas import get_patch_areas
 from options import OPTIONS, Options
 
 
@@ -31,7 +38,7 @@ def main():
     )
     parser.add_argument(
         "--placement-file",
-        help="Specify the location of a placement file json that is used directly as a plandomizer, overrides all other options",
+        help="Specify the location of a placement file (json or binary) that is used directly as a plandomizer, overrides all other options",
     )
     parser.add_argument(
         "--version",
@@ -88,6 +95,19 @@ def main():
         dest="bulk_threads",
     )
 
+    server_opts = parser.add_argument_group("server options")
+    server_opts.add_argument(
+        "--server",
+        help="Keeps running and answers generation and patching requests, one JSON object per line, on stdin or on a local port. The options given are the defaults of the requests",
+        action="store_true",
+    )
+    server_opts.add_argument(
+        "--port",
+        help="specify the localhost port to listen on instead of stdin",
+        type=int,
+        dest="server_port",
+    )
+
     parsed_args = parser.parse_args()
     if parsed_args.version:
         print(VERSION)
@@ -111,13 +131,17 @@ def main():
             print(err)
         exit(1)
 
-    areas = Areas(requirements, checks, hints, map_exits)
-
     plcmt_file_name = parsed_args.placement_file
     if plcmt_file_name is not None:
+        # Patching only needs the metadata of the areas, not their logic
+        areas = get_patch_areas()
         plcmt_file = PlacementFile()
-        with open(plcmt_file_name) as f:
-            plcmt_file.read_from_file(f)
+        with open(plcmt_file_name, "rb") as f:
+            plcmt_data = f.read()
+        if PlacementFile.is_binary(plcmt_data):
+            plcmt_file.read_from_binary(plcmt_data, areas)
+        else:
+            plcmt_file.read_from_str(plcmt_data.decode("utf-8"))
         plcmt_file.check_valid(areas)
 
         plandomizer = PlandoRandomizer(plcmt_file, areas)
@@ -134,8 +158,20 @@ def main():
         exit(0)
 
     assert options is not None
+    # Loads the logic YAML files, which the placement file path above doesn't need
+    from yaml_files import requirements, checks, hints, map_exits
+
+    areas = Areas(requirements, checks, hints, map_exits)
 
-    if parsed_args.bulk:
+    if parsed_args.server:
+        from randoserver import RandoServer
+
+        server = RandoServer(areas, options)
+        if parsed_args.server_port is None:
+            server.serve_stdio()
+        else:
+            server.serve_socket(parsed_args.server_port)
+    elif parsed_args.bulk:
         bulk_low = parsed_args.bulk_low
         bulk_high = parsed_args.bulk_high
         if bulk_high < bulk_low:
@@ -153,6 +189,10 @@ def main():
                     rando.randomize()
                 except KeyboardInterrupt:
                     raise
+                except SettingsInfeasible as e:
+                    # The other seeds would fail the same way
+                    print(f"ERROR: {e}", file=sys.stderr)
+                    return
                 except Exception as e:
                     import traceback
 
@@ -191,7 +231,19 @@ def main():
             progress_steps += 1
 
         rando.progress_callback = progress_callback
-        rando.randomize(update_progress_dialog)
+        while True:
+            try:
+                rando.randomize(update_progress_dialog)
+                break
+            except SettingsInfeasible as e:
+                print(f"ERROR: {e}")
+                exit(1)
+            except GenerationFailed as e:
+                if options["speculative-seeds"] == 1:
+                    raise
+                print(f"Seed {rando.seed} failed to generate: {e}")
+                rando.next_seed()
+                progress_steps = 0
         print(f"SEED HASH: {rando.randomizer_hash}")
     else:
         from gui.randogui import run_main_gui
@@ -200,4 +252,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed by the processes of speculative-seeds in the frozen executable
+    multiprocessing.freeze_support()
     main()
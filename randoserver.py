@@ -0,0 +1,145 @@
+from contextlib import redirect_stdout
+from pathlib import Path
+import base64
+import json
+import socketserver
+import sys
+import tempfile
+import traceback
+
+from logic.logic_input import Areas
+from logic.placement_file import PlacementFile, InvalidPlacementFile
+from options import Options
+from ssrando import (
+    Randomizer,
+    PlandoRandomizer,
+    GenerationFailed,
+    StartupException,
+)
+
+# Protocol: one JSON object per line for each request, answered by one JSON
+# object per line, in order. Every response repeats the "id" of its request.
+#
+# Generation: {"permalink": ..., "seed": ..., "options": {name: value}, "patch": bool}
+#   all optional, the options given to the server being the defaults.
+#   Without "patch", it is a dry run. The response has the "seed", the "hash"
+#   and the "files" written (spoiler log, placement files) by name,
+#   binary files being base64 encoded.
+# Patching a known placement: {"placement-file": json string}
+#   or {"binary-placement-file": base64 string}
+# Failures are answered with {"error": message}.
+
+
+class RandoServer:
+    """Keeps the areas loaded between generation and patching requests"""
+
+    def __init__(self, areas: Areas, options: Options):
+        self.areas = areas
+        self.options = options
+
+    def handle(self, request: dict) -> dict:
+        response = {"id": request.get("id")}
+        try:
+            # The randomizer prints its progress, which must not be mixed
+            # with the responses
+            with redirect_stdout(sys.stderr):
+                if "placement-file" in request or "binary-placement-file" in request:
+                    response.update(self.patch(request))
+                else:
+                    response.update(self.generate(request))
+        except (
+            GenerationFailed,
+            InvalidPlacementFile,
+            KeyError,
+            StartupException,
+            TypeError,
+            ValueError,
+        ) as e:
+            response["error"] = str(e)
+        except Exception as e:
+            traceback.print_exc()
+            response["error"] = f"{type(e).__name__}: {e}"
+        return response
+
+    def get_options(self, request: dict) -> Options:
+        options = self.options.copy()
+        if (permalink := request.get("permalink")) is not None:
+            options.update_from_permalink(permalink)
+        for option_name, value in request.get("options", {}).items():
+            options.set_option(option_name, value)
+        if (seed := request.get("seed")) is not None:
+            options.set_option("seed", seed)
+        options.set_option("dry-run", not request.get("patch", False))
+        options.set_option("out-placement-file", True)
+        return options
+
+    def generate(self, request: dict) -> dict:
+        options = self.get_options(request)
+        rando = Randomizer(self.areas, options)
+        if not options["dry-run"]:
+            rando.check_valid_directory_setup()
+        with tempfile.TemporaryDirectory() as log_dir:
+            rando.log_file_path = Path(log_dir)
+            while True:
+                try:
+                    rando.randomize()
+                    break
+                except GenerationFailed:
+                    if options["speculative-seeds"] == 1:
+                        raise
+                    rando.next_seed()
+            files = {}
+            for file in sorted(rando.log_file_path.iterdir()):
+                if file.suffix == ".sspf":
+                    files[file.name] = base64.b64encode(file.read_bytes()).decode()
+                else:
+                    files[file.name] = file.read_text()
+        return {"seed": rando.seed, "hash": rando.randomizer_hash, "files": files}
+
+    def patch(self, request: dict) -> dict:
+        plcmt_file = PlacementFile()
+        if (data := request.get("binary-placement-file")) is not None:
+            plcmt_file.read_from_binary(base64.b64decode(data), self.areas)
+        else:
+            plcmt_file.read_from_str(request["placement-file"])
+        plcmt_file.check_valid(self.areas)
+        plandomizer = PlandoRandomizer(plcmt_file, self.areas)
+        plandomizer.check_valid_directory_setup()
+        plandomizer.randomize()
+        return {"hash": plcmt_file.hash_str}
+
+    def handle_line(self, line: str) -> str:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests have to be JSON objects.")
+        except ValueError as e:
+            response = {"id": None, "error": f"Invalid request: {e}"}
+        else:
+            response = self.handle(request)
+        return json.dumps(response) + "\n"
+
+    def serve_stdio(self):
+        for line in sys.stdin:
+            if line.strip():
+                sys.stdout.write(self.handle_line(line))
+                sys.stdout.flush()
+
+    def serve_socket(self, port: int):
+        """
+        Serves the connections on localhost one at a time, the others waiting
+        for their turn, as the areas can't be shared between generations
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    line = line.decode("utf-8")
+                    if line.strip():
+                        self.wfile.write(server.handle_line(line).encode("utf-8"))
+                        self.wfile.flush()
+
+        with socketserver.TCPServer(("127.0.0.1", port), Handler) as tcp_server:
+            print(f"Listening on 127.0.0.1:{port}", file=sys.stderr)
+            tcp_server.serve_forever()
@@ -1,4 +1,12 @@
 from .u8file import U8File
 from .bzs import buildBzs, parseBzs
 from .msb import parseMSB, buildMSB
-from .allpatch import AllPatcher
+
+
+def __getattr__(name: str):
+    # The patcher needs the image libraries, only import them when patching
+    if name == "AllPatcher":
+        from .allpatch import AllPatcher
+
+        return AllPatcher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
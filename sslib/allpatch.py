@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Callable, Iterable, Dict, Optional, List
+from typing import Callable, Iterable, Dict, Optional, List, Set
 import re
 from io import BytesIO
 from collections import defaultdict
@@ -48,12 +48,14 @@ class AllPatcher:
         current_player_model_pack_name: str,
         current_loftwing_model_pack_name: str,
         copy_unmodified: bool = True,
+        verify_event_skips: bool = False,
     ):
         """
         Creates a new instance of the AllPatcher, which patches the game files but with a single callback for each resource type
         actual_extract_path: a path pointing to the root directory of the extracted game, so that it has the subdirectories DATA and UPDATE
         modified_extract_path: a path where to write the patched files to, should be a copy of the actual extract if intended to be repacked into an iso
         copy_unmodified: If unmodified Stage and Event files should be copied, other files are never copied
+        verify_event_skips: If event files that aren't going to be patched should still be parsed, to verify they really don't change
         """
         self.actual_extract_path = actual_extract_path
         self.modified_extract_path = modified_extract_path
@@ -62,6 +64,7 @@ class AllPatcher:
         self.current_player_model_pack_name = current_player_model_pack_name
         self.current_loftwing_model_pack_name = current_loftwing_model_pack_name
         self.copy_unmodified = copy_unmodified
+        self.verify_event_skips = verify_event_skips
         self.arc_replacements = {}
         if arc_replacement_path.is_dir():
             for replace_path in arc_replacement_path.rglob("*.arc"):
@@ -75,6 +78,7 @@ class AllPatcher:
         self.bzs_patch = None
         self.event_patch = None
         self.event_text_patch = None
+        self.event_files_to_patch = None
         self.tmp_dir = Path(tempfile.mkdtemp())
 
         def dummy_progress_callback(action):
@@ -121,6 +125,16 @@ class AllPatcher:
         """
         self.event_text_patch = patchfunc
 
+    def set_event_files_to_patch(self, event_files: Optional[Set[str]]):
+        """
+        Sets the names of all event files (without extension, for example `110-DivingGame`),
+        that the event patch functions could modify, all other files aren't even parsed.
+        The first digit of an event file is the number of the event arc that contains it,
+        so arcs without any of these files get skipped entirely.
+        If set to None, every event file gets passed to the patch functions
+        """
+        self.event_files_to_patch = event_files
+
     def create_oarc_cache(self, extracts):
         self.oarc_cache_path.mkdir(parents=True, exist_ok=True)
         for extract in extracts:
@@ -286,9 +300,9 @@ class AllPatcher:
         brres_data = arc_data.get_file_data("g3d/model.brres")
         parsed_BRRES = BRRES.parse_brres(BytesIO(brres_data))
 
+        brres_modified = False
         for tex_name in mask_lookup:
             tex_path = f"Textures(NW4R)/{tex_name}"
-            image_data: np.array = parsed_BRRES.get_file_data(path=tex_path)
             mask_paths = []
             colors = []
             process = False
@@ -304,12 +318,16 @@ class AllPatcher:
                 process = True
 
             if process:
+                # only decode the textures that actually get recoloured
+                image_data: np.array = parsed_BRRES.get_file_data(path=tex_path)
                 modified_texture: np.array = cr.process_texture(
                     texture=image_data, maskPaths=mask_paths, colors=colors
                 )
                 parsed_BRRES.set_file_data(path=tex_path, data=modified_texture)
+                brres_modified = True
 
-        arc_data.set_file_data("g3d/model.brres", parsed_BRRES.to_buffer().read())
+        if brres_modified:
+            arc_data.set_file_data("g3d/model.brres", parsed_BRRES.to_buffer().read())
         return arc_data
 
     def do_patch(self):
@@ -439,10 +457,18 @@ class AllPatcher:
 
         if modified_eventrootpath == None:
             raise Exception("Event files not found.")
+        if self.event_files_to_patch is None or self.verify_event_skips:
+            event_arcs_to_patch = None
+        else:
+            event_arcs_to_patch = set(name[0] for name in self.event_files_to_patch)
         for eventpath in modified_eventrootpath.glob("*.arc"):
             modified = False
             filename = eventpath.parts[-1]
             self.progress_callback(f"patching {filename}")
+            arc_match = EVENT_REGEX.match(filename)
+            if event_arcs_to_patch is not None:
+                if arc_match and not arc_match[1] in event_arcs_to_patch:
+                    continue
             modified_eventpath = modified_eventrootpath / filename
             eventarc = U8File.parse_u8(BytesIO(eventpath.read_bytes()))
             # make sure to handle text files first for labels
@@ -451,21 +477,34 @@ class AllPatcher:
             ):
                 eventfilename = eventfilepath.split("/")[-1]
                 if eventfilename.endswith(".msbf"):
-                    parsedMsb = parseMSB(eventarc.get_file_data(eventfilepath))
-                    if self.event_patch:
-                        patchedMsb = self.event_patch(parsedMsb, eventfilename[:-5])
-                        if patchedMsb:
-                            eventarc.set_file_data(eventfilepath, buildMSB(patchedMsb))
-                            modified = True
+                    patchfunc = self.event_patch
                 elif eventfilename.endswith(".msbt"):
-                    parsedMsb = parseMSB(eventarc.get_file_data(eventfilepath))
-                    if self.event_text_patch:
-                        patchedMsb = self.event_text_patch(
-                            parsedMsb, eventfilename[:-5]
+                    patchfunc = self.event_text_patch
+                else:
+                    continue
+                should_patch = (
+                    self.event_files_to_patch is None
+                    or eventfilename[:-5] in self.event_files_to_patch
+                )
+                if not patchfunc or not (should_patch or self.verify_event_skips):
+                    continue
+                parsedMsb = parseMSB(eventarc.get_file_data(eventfilepath))
+                patchedMsb = patchfunc(parsedMsb, eventfilename[:-5])
+                if patchedMsb:
+                    if not should_patch:
+                        raise Exception(
+                            f"{eventfilename} was patched, but isn't in the event files to patch."
                         )
-                        if patchedMsb:
-                            eventarc.set_file_data(eventfilepath, buildMSB(patchedMsb))
-                            modified = True
+                    if (
+                        self.verify_event_skips
+                        and arc_match
+                        and arc_match[1] != eventfilename[0]
+                    ):
+                        raise Exception(
+                            f"{eventfilename} was patched, but its arc {filename} would have been skipped."
+                        )
+                    eventarc.set_file_data(eventfilepath, buildMSB(patchedMsb))
+                    modified = True
             if modified:
                 write_bytes_create_dirs(modified_eventpath, eventarc.to_buffer())
                 # print(f'patched {filename}')
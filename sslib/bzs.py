@@ -1,35 +1,50 @@
 # initial parsing from mrcheezes skyward-sword-tools
 # parsing of stage and room files
 
-from typing import NewType
-from collections import OrderedDict
+from typing import Callable, List, NewType, Optional
+from collections import OrderedDict, defaultdict
 import struct
 
-from .utils import unpack, toStr, toBytes
+from .utils import toStr, toBytes
 
 nodestruct = ">4shhi"
 nodestructnames = "name count ff offset"
+compiled_nodestruct = struct.Struct(nodestruct)
+compiled_layerstruct = struct.Struct(">hhi")
 
 ParsedBzs = NewType("ParsedBzs", OrderedDict)
 
 
 def parseBzs(data: bytes) -> ParsedBzs:
-    name, count, ff, offset = struct.unpack(">4shhi", data[:12])
+    data = bytes(data)
+    name, count, ff, offset = compiled_nodestruct.unpack_from(data, 0)
     assert ff == -1
     name = name.decode("ascii")
-    return parseObj(name, count, data[offset:])
+    return parseObj(name, count, data, offset)
 
 
-def parseObj(objtype, quantity, data):
+def readStr(data: bytes, offset: int) -> str:
+    """Reads a null terminated, shift-jis encoded string starting at offset"""
+    end = data.find(b"\x00", offset)
+    if end == -1:
+        end = len(data)
+    return data[offset:end].decode("shift-jis")
+
+
+def parseObj(objtype, quantity, data, offset=0):
+    """
+    Parses the object of the given type, that starts at offset in data
+    offsets are always passed down instead of slicing the data, so nothing gets copied
+    """
     if objtype == "V001":
         # root
         parsed = OrderedDict()
         for i in range(quantity):
-            addr = i * 12
-            name, count, ff, offset = struct.unpack(">4shhi", data[addr : addr + 12])
+            addr = offset + i * 12
+            name, count, ff, suboffset = compiled_nodestruct.unpack_from(data, addr)
             assert ff == -1
             name = name.decode("ascii")
-            parsed[name] = parseObj(name, count, data[addr + offset :])
+            parsed[name] = parseObj(name, count, data, addr + suboffset)
             # if name != 'LAY ':
             #    parsed[name]=len(parsed[name])
         return parsed
@@ -38,41 +53,40 @@ def parseObj(objtype, quantity, data):
         assert quantity == 29
         parsed = OrderedDict()
         for i in range(quantity):
-            addr = i * 8
-            count, ff, offset = struct.unpack(">hhi", data[addr : addr + 8])
+            addr = offset + i * 8
+            count, ff, suboffset = compiled_layerstruct.unpack_from(data, addr)
             if count == 0:
                 parsed["l%d" % i] = OrderedDict()
             else:
-                parsed["l%d" % i] = parseObj("V001", count, data[addr + offset :])
+                parsed["l%d" % i] = parseObj("V001", count, data, addr + suboffset)
         return parsed
 
     elif objtype in ("OBJN", "ARCN"):
         parsed = []
         for i in range(quantity):
-            addr = data[2 * i] * 0x100 + data[2 * i + 1]
-            name = toStr(data[addr:])
-            parsed.append(name)
+            addr = data[offset + 2 * i] * 0x100 + data[offset + 2 * i + 1]
+            parsed.append(readStr(data, offset + addr))
         return parsed
     elif objtype == "RMPL":
         parsed = OrderedDict()
         for i in range(quantity):
-            rmpldata = data[4 * i :]
-            rmpl_id = rmpldata[0]
-            count = rmpldata[1]
-            addr = rmpldata[2] * 0x100 + rmpldata[3]
-            parsed[rmpl_id] = []
-            for j in range(count):
-                parsed[rmpl_id].append(rmpldata[addr + 2 * j : addr + 2 * j + 2])
+            rmploffset = offset + 4 * i
+            rmpl_id = data[rmploffset]
+            count = data[rmploffset + 1]
+            addr = rmploffset + data[rmploffset + 2] * 0x100 + data[rmploffset + 3]
+            parsed[rmpl_id] = [
+                data[addr + 2 * j : addr + 2 * j + 2] for j in range(count)
+            ]
         return parsed
 
     else:
-        # objects with quantities
+        # objects with quantities, all records of one type have the same layout
+        fields, codec, hasname = compiled_objectstructs[objtype]
+        records = memoryview(data)[offset : offset + codec.size * quantity]
         parsed = []
-        structnames, structdef, size = objectstructs[objtype]
-        for i in range(quantity):
-            item = data[size * i : size * (i + 1)]
-            unpacked = unpack(structnames, structdef, item)
-            if "name" in unpacked.keys():
+        for values in codec.iter_unpack(records):
+            unpacked = dict(zip(fields, values))
+            if hasname:
                 unpacked["name"] = toStr(unpacked["name"])
             parsed.append(unpacked)
 
@@ -176,9 +190,20 @@ namelengths = {
 }
 
 
+# precompiled (fieldnames, struct, has name field) for every object type
+compiled_objectstructs = {
+    objtype: (
+        tuple(structnames.split()),
+        struct.Struct(structdef),
+        "name" in structnames.split(),
+    )
+    for objtype, (structnames, structdef, _) in objectstructs.items()
+}
+
+
 def buildBzs(root: ParsedBzs) -> bytes:
     count, odata = buildObj("V001", root)
-    data = struct.pack(nodestruct, b"V001", count, -1, 12) + odata
+    data = compiled_nodestruct.pack(b"V001", count, -1, 12) + odata
 
     # padding
     pad = 32 - (len(data) % 32)
@@ -192,53 +217,59 @@ def buildObj(objtype, objdata) -> (int, bytes):  # number of elements, bytes of
     if objtype == "V001":
         assert type(objdata) == OrderedDict
         offset = len(objdata) * 12
-        body = b""
-        headerbytes = b""
-        for typ, obj in objdata.items():
+        headerparts = []
+        bodyparts = []
+        bodylength = 0
+        for i, (typ, obj) in enumerate(objdata.items()):
             count, data = buildObj(typ, obj)
             # pad to 4
-            pad = (4 - (len(data) % 4)) * b"\xFF"
-            if len(pad) == 4:
-                pad = b""
-            headerbytes += struct.pack(
-                nodestruct,
-                typ.encode("ASCII"),
-                count,
-                -1,
-                len(body) - len(headerbytes) + offset,
+            pad = (-len(data) % 4) * b"\xFF"
+            headerparts.append(
+                compiled_nodestruct.pack(
+                    typ.encode("ASCII"),
+                    count,
+                    -1,
+                    bodylength - i * 12 + offset,
+                )
             )
-            body += data + pad
+            bodyparts.append(data)
+            bodyparts.append(pad)
+            bodylength += len(data) + len(pad)
             # body+=(16-(len(body)%16))*b'\xFF'
-        return (len(objdata), headerbytes + body)
+        return (len(objdata), b"".join(headerparts + bodyparts))
     elif objtype == "LAY ":
         assert type(objdata) == OrderedDict
         assert len(objdata) == 29
         offset = 29 * 8
-        body = b""
-        headerbytes = b""
-        for layer in objdata.values():
+        headerparts = []
+        bodyparts = []
+        bodylength = 0
+        for i, layer in enumerate(objdata.values()):
             if not layer:
-                headerbytes += struct.pack(">hhi", 0, -1, 0)
+                headerparts.append(compiled_layerstruct.pack(0, -1, 0))
             else:
                 count, data = buildObj("V001", layer)
-                dataoffset = len(body) - len(headerbytes) + offset
+                dataoffset = bodylength - i * 8 + offset
                 # pad to 4
-                pad = (4 - (len(data) % 4)) * b"\xFF"
-                if len(pad) == 4:
-                    pad = b""
-                headerbytes += struct.pack(">hhi", count, -1, dataoffset)
-                body += data + pad
-        return (29, headerbytes + body)
+                pad = (-len(data) % 4) * b"\xFF"
+                headerparts.append(compiled_layerstruct.pack(count, -1, dataoffset))
+                bodyparts.append(data)
+                bodyparts.append(pad)
+                bodylength += len(data) + len(pad)
+        return (29, b"".join(headerparts + bodyparts))
 
     elif objtype in ("OBJN", "ARCN"):
         assert type(objdata) == list
         offset = len(objdata) * 2
-        sbytes = b""
-        headerbytes = b""
+        stringparts = []
+        stringlength = 0
+        headerbytes = bytearray()
         for s in objdata:
-            headerbytes += struct.pack(">H", len(sbytes) + offset)
-            sbytes += s.encode("ASCII") + b"\x00"
-        return (len(objdata), headerbytes + sbytes)
+            headerbytes += struct.pack(">H", stringlength + offset)
+            encoded = s.encode("ASCII") + b"\x00"
+            stringparts.append(encoded)
+            stringlength += len(encoded)
+        return (len(objdata), bytes(headerbytes) + b"".join(stringparts))
     elif objtype == "RMPL":
         assert type(objdata) == OrderedDict
         offset = len(objdata) * 4
@@ -253,9 +284,115 @@ def buildObj(objtype, objdata) -> (int, bytes):  # number of elements, bytes of
 
     else:
         assert type(objdata) == list
-        for obj in objdata:
-            if "name" in obj:
-                obj["name"] = toBytes(obj["name"], namelengths[objtype])
-        _, structdef, _ = objectstructs[objtype]
-        mapped = (struct.pack(structdef, *obj.values()) for obj in objdata)
+        fields, codec, hasname = compiled_objectstructs[objtype]
+        if hasname:
+            namelength = namelengths[objtype]
+            mapped = (
+                codec.pack(
+                    *(
+                        toBytes(obj[field], namelength)
+                        if field == "name"
+                        else obj[field]
+                        for field in fields
+                    )
+                )
+                for obj in objdata
+            )
+        else:
+            mapped = (codec.pack(*(obj[field] for field in fields)) for obj in objdata)
         return (len(objdata), b"".join(mapped))
+
+
+# object types that are actors, they have an id and are referenced by name in OBJN
+ACTOR_OBJTYPES = ["OBJS", "OBJ ", "SOBS", "SOBJ", "STAS", "STAG", "SNDT", "DOOR"]
+
+
+class BzsIndex:
+    """
+    Lookup tables for the objects of a parsed bzs, by (layer, objtype) and id or name
+    layer is None for objects that aren't part of a layer
+    all changes to the object lists have to go through this class, to keep it in sync
+    """
+
+    def __init__(self, bzs: ParsedBzs):
+        self.bzs = bzs
+        # (layer, objtype) -> id -> objects with that id, in list order
+        self.by_id = defaultdict(lambda: defaultdict(list))
+        # (layer, objtype) -> name -> objects with that name, in list order
+        self.by_name = defaultdict(lambda: defaultdict(list))
+        self.highest_id = 0
+        for objtype, objlist in bzs.items():
+            if objtype in compiled_objectstructs:
+                for obj in objlist:
+                    self._add_to_index(None, objtype, obj)
+        for layername, layer in bzs.get("LAY ", {}).items():
+            layerid = int(layername[1:])
+            for objtype, objlist in layer.items():
+                if objtype in compiled_objectstructs:
+                    for obj in objlist:
+                        self._add_to_index(layerid, objtype, obj)
+                # the last object of each actor type has the highest id
+                if objtype in ACTOR_OBJTYPES:
+                    id = objlist[-1]["id"] & 0x3FF
+                    if id != 0x3FF:  # aparently some objects have the max id?
+                        self.highest_id = max(self.highest_id, id)
+
+    def _add_to_index(self, layer: Optional[int], objtype: str, obj: dict):
+        if "id" in obj:
+            self.by_id[(layer, objtype)][obj["id"]].append(obj)
+        if "name" in obj:
+            self.by_name[(layer, objtype)][obj["name"]].append(obj)
+
+    def _remove_from_index(self, layer: Optional[int], objtype: str, obj: dict):
+        # objects are compared by identity, there can be identical copies
+        if "id" in obj:
+            objs = self.by_id[(layer, objtype)][obj["id"]]
+            del objs[next(i for i, x in enumerate(objs) if x is obj)]
+        if "name" in obj:
+            objs = self.by_name[(layer, objtype)][obj["name"]]
+            del objs[next(i for i, x in enumerate(objs) if x is obj)]
+
+    def get_list(
+        self, layer: Optional[int], objtype: str, create: bool = False
+    ) -> list:
+        container = self.bzs if layer is None else self.bzs["LAY "][f"l{layer}"]
+        if create and objtype not in container:
+            container[objtype] = []
+        return container[objtype]
+
+    def find_by_id(self, layer: Optional[int], objtype: str, id: int) -> List[dict]:
+        return self.by_id[(layer, objtype)].get(id, [])
+
+    def find_by_name(self, layer: Optional[int], objtype: str, name: str) -> List[dict]:
+        return self.by_name[(layer, objtype)].get(name, [])
+
+    def next_id(self) -> int:
+        """Reserves a new object id, that is higher than all existing ones"""
+        self.highest_id += 1
+        return self.highest_id
+
+    def append(self, layer: Optional[int], objtype: str, obj: dict):
+        self.get_list(layer, objtype, create=True).append(obj)
+        self._add_to_index(layer, objtype, obj)
+
+    def remove(self, layer: Optional[int], objtype: str, obj: dict):
+        objlist = self.get_list(layer, objtype)
+        del objlist[next(i for i, x in enumerate(objlist) if x is obj)]
+        self._remove_from_index(layer, objtype, obj)
+
+    def pop(self, layer: Optional[int], objtype: str, index: int) -> dict:
+        obj = self.get_list(layer, objtype).pop(index)
+        self._remove_from_index(layer, objtype, obj)
+        return obj
+
+    def patch_object(
+        self,
+        layer: Optional[int],
+        objtype: str,
+        obj: dict,
+        patchfunc: Callable[[dict], None],
+    ):
+        """Calls patchfunc on the object, it's allowed to change the id and name"""
+        self._remove_from_index(layer, objtype, obj)
+        patchfunc(obj)
+        self._add_to_index(layer, objtype, obj)
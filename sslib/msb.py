@@ -2,7 +2,7 @@ from collections import OrderedDict
 import struct
 from typing import NewType
 
-from .utils import unpack, toStr, toBytes
+from .utils import toStr, toBytes
 
 FLOWTYPES = {"type1": 1, "switch": 2, "type3": 3, "start": 4}
 
@@ -49,8 +49,60 @@ def process_control_sequences(data: str) -> str:
     return data
 
 
+FLOWNODE_FIELDS = (
+    "type",
+    "subType",
+    "param1",
+    "param2",
+    "next",
+    "param3",
+    "param4",
+    "param5",
+)
+FLOWNODE_STRUCT = struct.Struct(">bb2xhhhhhh")
+BUILD_FLOWNODE_STRUCT = struct.Struct(">bbhhhhhhh")
+SEGMENT_HEADER_STRUCT = struct.Struct(">4siii")
+SEGMENT_IDS = ("FLW3", "FEN1", "LBL1", "ATR1", "TXT2")
+
+
+class LazyMsb(OrderedDict):
+    """
+    A parsed msb file, that only decodes segments when they are accessed
+    segments that are never accessed are written back as they were by buildMSB
+    """
+
+    def __init__(self):
+        super().__init__()
+        # seg_id -> undecoded segment data
+        self.raw_segments = {}
+
+    def add_raw_segment(self, seg_id: str, seg_data: memoryview):
+        super().__setitem__(seg_id, None)
+        self.raw_segments[seg_id] = seg_data
+
+    def __getitem__(self, key):
+        if key in self.raw_segments:
+            super().__setitem__(key, parseSegment(key, self.raw_segments.pop(key)))
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self.raw_segments.pop(key, None)
+        super().__setitem__(key, value)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+
 def parseMSB(data: bytes) -> ParsedMsb:
-    parsed = OrderedDict()
+    parsed = LazyMsb()
     if data[:10] == b"MsgFlwBn\xFE\xFF":
         parsed["type"] = "MsgFlwBn"
         assert data[10:16] == b"\x00\x00\x00\x03\x00\x02"
@@ -60,11 +112,11 @@ def parseMSB(data: bytes) -> ParsedMsb:
     else:
         raise Exception("Unsupported filetype.")
     assert struct.unpack(">i", data[0x12:0x16])[0] == len(data)
+    data = memoryview(data)
     pos = 0x20
     while pos < len(data):
-        seg_header = data[pos : pos + 0x10]
+        seg_id, seg_len, zero1, zero2 = SEGMENT_HEADER_STRUCT.unpack_from(data, pos)
         pos += 0x10
-        seg_id, seg_len, zero1, zero2 = struct.unpack(">4siii", seg_header)
         assert zero1 == 0
         assert zero2 == 0
         seg_id = seg_id.decode("ascii")
@@ -72,71 +124,70 @@ def parseMSB(data: bytes) -> ParsedMsb:
         pos += seg_len
         pos += -pos % 0x10
         assert not seg_id in parsed
-        if seg_id == "FLW3":
-            parsed["FLW3"] = OrderedDict()
-            parsed["FLW3"]["flow"] = []
-            parsed["FLW3"]["branch_points"] = []
-            count1, count2 = struct.unpack(">hh12x", seg_data[:0x10])
-            for i in range(count1):  # for every node in FLW3
-                item = unpack(
-                    "type subType param1 param2 next param3 param4 param5",
-                    ">bb2xhhhhhh",
-                    seg_data[0x10 + 0x10 * i : 0x20 + 0x10 * i],
-                )
-                assert item["type"] in (1, 2, 3, 4)
-                item["type"] = ["type1", "switch", "type3", "start"][item["type"] - 1]
-                parsed["FLW3"]["flow"].append(item)
-            for i in range(count2):  # for every branch point
-                item = struct.unpack(
-                    ">h",
-                    seg_data[
-                        0x10 + 0x10 * count1 + 2 * i : 0x12 + 0x10 * count1 + 2 * i
-                    ],
-                )[0]
-                parsed["FLW3"]["branch_points"].append(item)
-        elif seg_id == "FEN1" or seg_id == "LBL1":
-            parsed[seg_id] = []
-            count = struct.unpack(">i", seg_data[:4])[0]
-            for i in range(count):
-                count, ptr = struct.unpack(">ii", seg_data[4 + 8 * i : 0xC + 8 * i])
-                entrypoint_group = []
-                for _ in range(count):
-                    strlen = seg_data[ptr]
-                    string = seg_data[1 + ptr : 1 + ptr + strlen].decode("ascii")
-                    value = struct.unpack(
-                        ">i", seg_data[1 + ptr + strlen : 5 + ptr + strlen]
-                    )[0]
-                    entrypoint = OrderedDict()
-                    entrypoint["name"] = string
-                    entrypoint["value"] = value
-                    entrypoint_group.append(entrypoint)
-                    ptr += 5 + strlen
-                parsed[seg_id].append(entrypoint_group)
-        elif seg_id == "ATR1":
-            parsed["ATR1"] = []
-            count, dimension = struct.unpack(">ii", seg_data[:8])
-            for i in range(count):
-                cur_list = []
-                for j in range(dimension):
-                    cur_list.append(seg_data[8 + i * dimension + j])
-                parsed["ATR1"].append(cur_list)
-        elif seg_id == "TXT2":
-            parsed["TXT2"] = []
-            count = struct.unpack(">i", seg_data[:4])[0]
-            indices = [
-                struct.unpack(">i", seg_data[4 + 4 * i : 8 + 4 * i])[0]
-                for i in range(count)
-            ]
-            for i in range(count):  # for every item of text
-                bytestring = seg_data[
-                    indices[i] : (indices[i + 1] if i + 1 < count else seg_len) - 2
-                ]
-                parsed["TXT2"].append(bytestring)
-        else:
+        if not seg_id in SEGMENT_IDS:
             raise Exception(f"Unsupported seg_id: {seg_id}.")
+        # only decoded when accessed
+        parsed.add_raw_segment(seg_id, seg_data)
     return parsed
 
 
+def parseSegment(seg_id: str, seg_data: memoryview):
+    seg_len = len(seg_data)
+    if seg_id == "FLW3":
+        parsed = OrderedDict()
+        parsed["flow"] = []
+        count1, count2 = struct.unpack_from(">hh", seg_data, 0)
+        # for every node in FLW3
+        flow_data = seg_data[0x10 : 0x10 + 0x10 * count1]
+        for values in FLOWNODE_STRUCT.iter_unpack(flow_data):
+            item = dict(zip(FLOWNODE_FIELDS, values))
+            assert item["type"] in (1, 2, 3, 4)
+            item["type"] = ["type1", "switch", "type3", "start"][item["type"] - 1]
+            parsed["flow"].append(item)
+        # for every branch point
+        parsed["branch_points"] = list(
+            struct.unpack_from(f">{count2}h", seg_data, 0x10 + 0x10 * count1)
+        )
+        return parsed
+    elif seg_id == "FEN1" or seg_id == "LBL1":
+        parsed = []
+        count = struct.unpack_from(">i", seg_data, 0)[0]
+        for i in range(count):
+            count, ptr = struct.unpack_from(">ii", seg_data, 4 + 8 * i)
+            entrypoint_group = []
+            for _ in range(count):
+                strlen = seg_data[ptr]
+                string = str(seg_data[1 + ptr : 1 + ptr + strlen], "ascii")
+                value = struct.unpack_from(">i", seg_data, 1 + ptr + strlen)[0]
+                entrypoint = OrderedDict()
+                entrypoint["name"] = string
+                entrypoint["value"] = value
+                entrypoint_group.append(entrypoint)
+                ptr += 5 + strlen
+            parsed.append(entrypoint_group)
+        return parsed
+    elif seg_id == "ATR1":
+        parsed = []
+        count, dimension = struct.unpack_from(">ii", seg_data, 0)
+        for i in range(count):
+            parsed.append(list(seg_data[8 + i * dimension : 8 + (i + 1) * dimension]))
+        return parsed
+    elif seg_id == "TXT2":
+        parsed = []
+        count = struct.unpack_from(">i", seg_data, 0)[0]
+        indices = struct.unpack_from(f">{count}i", seg_data, 4)
+        for i in range(count):  # for every item of text
+            bytestring = bytes(
+                seg_data[
+                    indices[i] : (indices[i + 1] if i + 1 < count else seg_len) - 2
+                ]
+            )
+            parsed.append(bytestring)
+        return parsed
+    else:
+        raise Exception(f"Unsupported seg_id: {seg_id}.")
+
+
 def buildMSB(msb: ParsedMsb) -> bytes:
     if msb["type"] == "MsgFlwBn":
         header = b"MsgFlwBn\xFE\xFF"
@@ -147,67 +198,16 @@ def buildMSB(msb: ParsedMsb) -> bytes:
     else:
         raise Exception(f'Unsupported filetype: {msb["type"]}.')
     header = bytearray(header + b"\x00" * 16)
-    total_body = b""
-    for seg_id, seg_data in msb.items():
-        body = b""
+    total_body = bytearray()
+    raw_segments = msb.raw_segments if isinstance(msb, LazyMsb) else {}
+    for seg_id in msb.keys():
         if seg_id == "type":
             continue
-        if seg_id == "FLW3":
-            body += struct.pack(
-                ">hh", len(seg_data["flow"]), len(seg_data["branch_points"])
-            )
-            body += b"\x00" * 12
-            for flow in seg_data["flow"]:
-                body += struct.pack(
-                    ">bbhhhhhhh",
-                    FLOWTYPES[flow["type"]],
-                    flow["subType"],
-                    0,
-                    flow["param1"],
-                    flow["param2"],
-                    flow["next"],
-                    flow["param3"],
-                    flow["param4"],
-                    flow["param5"],
-                )
-            for branch_point in seg_data["branch_points"]:
-                body += struct.pack(">h", branch_point)
-        elif seg_id == "FEN1" or seg_id == "LBL1":
-            data = b""
-            offset = len(seg_data) * 8 + 4
-            seg_body = b""
-            for subseg in seg_data:
-                data += struct.pack(">ii", len(subseg), offset + len(seg_body))
-                for subsub in subseg:
-                    seg_body += struct.pack(">b", len(subsub["name"]))
-                    seg_body += subsub["name"].encode("ascii")
-                    seg_body += struct.pack(">i", subsub["value"])
-            data += seg_body
-            body += struct.pack(">i", len(seg_data))
-            body += data
-        elif seg_id == "ATR1":
-            dimension = None
-            for atr in seg_data:
-                if dimension is None:
-                    dimension = len(atr)
-                else:
-                    assert dimension == len(atr)
-            body += struct.pack(">ii", len(seg_data), dimension)
-            for atr in seg_data:
-                for val in atr:
-                    body += struct.pack(">b", val)
-        elif seg_id == "TXT2":
-            body += struct.pack(">i", len(seg_data))
-            offset = 4 * len(seg_data) + 4
-            seg_header = b""
-            seg_body = b""
-            for txt in seg_data:
-                seg_header += struct.pack(">i", offset + len(seg_body))
-                seg_body += txt + b"\x00\x00"
-            body += seg_header
-            body += seg_body
+        if seg_id in raw_segments:
+            # never accessed, so it can't be modified
+            body = raw_segments[seg_id]
         else:
-            raise Exception(f"Unsupported seg_id: {seg_id}.")
+            body = buildSegment(seg_id, msb[seg_id])
         total_body += seg_id.encode("ascii")
         total_body += struct.pack(">i", len(body)) + 8 * b"\x00"
         total_body += body
@@ -218,3 +218,63 @@ def buildMSB(msb: ParsedMsb) -> bytes:
     header[0x14] = (total_length >> 8) & 0xFF
     header[0x15] = total_length & 0xFF
     return header + total_body
+
+
+def buildSegment(seg_id: str, seg_data) -> bytes:
+    body = bytearray()
+    if seg_id == "FLW3":
+        body += struct.pack(
+            ">hh", len(seg_data["flow"]), len(seg_data["branch_points"])
+        )
+        body += b"\x00" * 12
+        for flow in seg_data["flow"]:
+            body += BUILD_FLOWNODE_STRUCT.pack(
+                FLOWTYPES[flow["type"]],
+                flow["subType"],
+                0,
+                flow["param1"],
+                flow["param2"],
+                flow["next"],
+                flow["param3"],
+                flow["param4"],
+                flow["param5"],
+            )
+        body += struct.pack(
+            f">{len(seg_data['branch_points'])}h", *seg_data["branch_points"]
+        )
+    elif seg_id == "FEN1" or seg_id == "LBL1":
+        data = bytearray()
+        offset = len(seg_data) * 8 + 4
+        seg_body = bytearray()
+        for subseg in seg_data:
+            data += struct.pack(">ii", len(subseg), offset + len(seg_body))
+            for subsub in subseg:
+                seg_body += struct.pack(">b", len(subsub["name"]))
+                seg_body += subsub["name"].encode("ascii")
+                seg_body += struct.pack(">i", subsub["value"])
+        data += seg_body
+        body += struct.pack(">i", len(seg_data))
+        body += data
+    elif seg_id == "ATR1":
+        dimension = None
+        for atr in seg_data:
+            if dimension is None:
+                dimension = len(atr)
+            else:
+                assert dimension == len(atr)
+        body += struct.pack(">ii", len(seg_data), dimension)
+        for atr in seg_data:
+            body += struct.pack(f">{len(atr)}b", *atr)
+    elif seg_id == "TXT2":
+        body += struct.pack(">i", len(seg_data))
+        offset = 4 * len(seg_data) + 4
+        seg_header = bytearray()
+        seg_body = bytearray()
+        for txt in seg_data:
+            seg_header += struct.pack(">i", offset + len(seg_body))
+            seg_body += txt + b"\x00\x00"
+        body += seg_header
+        body += seg_body
+    else:
+        raise Exception(f"Unsupported seg_id: {seg_id}.")
+    return body
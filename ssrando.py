@@ -1,16 +1,17 @@
 from collections import OrderedDict
-from functools import cached_property
+from functools import cache, cached_property
 import sys
+import os
 import re
 import random
 from pathlib import Path
 import hashlib
 import json
+import multiprocessing
 import yaml
 import subprocess
 
 from logic.constants import *
-from logic.inventory import EXTENDED_ITEM
 from logic.fill_algo_common import UserOutput
 from logic.randomize import Rando
 from logic.hints import Hints
@@ -18,13 +19,11 @@ from logic.logic_input import Areas
 from logic.placement_file import PlacementFile
 import SpoilerLog
 
-from gamepatches import GamePatcher, GAMEPATCH_TOTAL_STEP_COUNT
 from paths import CUSTOM_HINT_DISTRIBUTION_PATH, RANDO_ROOT_PATH, IS_RUNNING_FROM_SOURCE
 from options import OPTIONS, Options
-from sslib.utils import encodeBytes
 from version import VERSION, VERSION_WITHOUT_COMMIT
 
-from typing import List, Callable
+from typing import Dict, Iterable, List, Callable
 
 
 class StartupException(Exception):
@@ -35,6 +34,10 @@ class GenerationFailed(Exception):
     pass
 
 
+class SettingsInfeasible(StartupException):
+    """No seed can generate with these settings, so there is no point retrying"""
+
+
 def dummy_progress_callback(current_action_name):
     pass
 
@@ -61,26 +64,115 @@ class BaseRandomizer:
         raise NotImplementedError("abstract")
 
 
-def calculate_rando_hash(seed: int, options: Options):
-    assert seed != -1
+@cache
+def get_hash_names() -> List[str]:
+    with open(RANDO_ROOT_PATH / "names.txt") as f:
+        return [s.strip() for s in f.readlines()]
+
+
+# The normalized custom hint distribution, with the size and modification time
+# of the file it was read from
+custom_distribution_json: tuple[tuple[int, int], bytes] | None = None
+
+
+def get_custom_distribution_json() -> bytes:
+    global custom_distribution_json
+    if not CUSTOM_HINT_DISTRIBUTION_PATH.exists():
+        raise Exception(
+            "Custom hint distribution file not found. Make sure custom_hint_distribution.json exists at the same location as the randomizer"
+        )
+    stat = CUSTOM_HINT_DISTRIBUTION_PATH.stat()
+    file_version = (stat.st_size, stat.st_mtime_ns)
+    if custom_distribution_json is None or custom_distribution_json[0] != file_version:
+        with CUSTOM_HINT_DISTRIBUTION_PATH.open("r") as f:
+            normalized_json = json.dumps(json.load(f)).encode("ASCII")
+        custom_distribution_json = (file_version, normalized_json)
+    return custom_distribution_json[1]
+
+
+def calculate_rando_hashes(seeds: Iterable[int], options: Options) -> Dict[int, str]:
+    """The hashes of several seeds with the same options"""
     # hash of seed, options, version
-    current_hash = hashlib.md5()
-    current_hash.update(str(seed).encode("ASCII"))
-    current_hash.update(options.get_permalink().encode("ASCII"))
-    current_hash.update(VERSION.encode("ASCII"))
+    permalink = options.get_permalink(exclude_seed=True)
+    suffix = VERSION.encode("ASCII")
     if options["hint-distribution"] == "Custom":
-        if not CUSTOM_HINT_DISTRIBUTION_PATH.exists():
-            raise Exception(
-                "Custom hint distribution file not found. Make sure custom_hint_distribution.json exists at the same location as the randomizer"
-            )
-        with CUSTOM_HINT_DISTRIBUTION_PATH.open("r") as f:
-            normalized_json = json.dumps(json.load(f))
-            current_hash.update(normalized_json.encode("ASCII"))
-    with open(RANDO_ROOT_PATH / "names.txt") as f:
-        names = [s.strip() for s in f.readlines()]
-    hash_random = random.Random()
-    hash_random.seed(current_hash.digest())
-    return " ".join(hash_random.choice(names) for _ in range(3))
+        suffix += get_custom_distribution_json()
+    names = get_hash_names()
+
+    hashes = {}
+    for seed in seeds:
+        assert seed != -1
+        current_hash = hashlib.md5()
+        current_hash.update(str(seed).encode("ASCII"))
+        current_hash.update(f"{permalink}#{seed}".encode("ASCII"))
+        current_hash.update(suffix)
+        hash_random = random.Random()
+        hash_random.seed(current_hash.digest())
+        hashes[seed] = " ".join(hash_random.choice(names) for _ in range(3))
+    return hashes
+
+
+def calculate_rando_hash(seed: int, options: Options):
+    return calculate_rando_hashes([seed], options)[seed]
+
+
+worker_areas: Areas
+worker_options: Options
+
+
+def init_generation_worker(areas: Areas | None, options: Options):
+    global worker_areas, worker_options
+    # The attempts print their seed, which must not end up in the output of the
+    # parent process, such as the responses of the server
+    sys.stdout = open(os.devnull, "w")
+    if areas is None:
+        # Spawned processes don't inherit the areas, so they have to be built again
+        from yaml_files import requirements, checks, hints, map_exits
+
+        areas = Areas(requirements, checks, hints, map_exits)
+    worker_areas = areas
+    worker_options = options
+
+
+def try_generation(seed: int) -> bool:
+    options = worker_options.copy()
+    options.set_option("seed", seed)
+    try:
+        Randomizer(worker_areas, options).generate()
+    except GenerationFailed:
+        return False
+    return True
+
+
+def find_generating_seed(
+    areas: Areas,
+    options: Options,
+    first_seed: int,
+    processes: int,
+    context: multiprocessing.context.BaseContext | None = None,
+) -> int:
+    """
+    Tries the seeds from first_seed onwards in parallel, and returns the lowest one
+    that generates, which is the one retrying seeds one at a time would end on.
+    context defaults to the platform's, which must not be fork in a process
+    running other threads
+    """
+    if context is None:
+        context = multiprocessing.get_context()
+    inherit_areas = context.get_start_method() == "fork"
+    with context.Pool(
+        processes,
+        init_generation_worker,
+        (areas if inherit_areas else None, options),
+    ) as pool:
+        seed = first_seed
+        while True:
+            seeds = range(seed, seed + processes)
+            for candidate, success in zip(seeds, pool.imap(try_generation, seeds)):
+                if success:
+                    # Leaving the pool terminates the attempts still running
+                    return candidate
+            seed += processes
 
 
 class Randomizer(BaseRandomizer):
@@ -132,6 +224,22 @@ class Randomizer(BaseRandomizer):
         self.randomizer_hash = calculate_rando_hash(self.seed, self.options)
         print(f"Seed: {self.seed}")
 
+    def next_seed(self, context: multiprocessing.context.BaseContext | None = None):
+        """
+        Moves on to the next seed after a generation failure, or directly to the
+        first one that generates if several seeds may be tried in parallel,
+        in processes started from context
+        """
+        processes = self.options["speculative-seeds"]
+        if processes > 1:
+            seed = find_generating_seed(
+                self.areas, self.options, self.seed + 1, processes, context
+            )
+            self.options.set_option("seed", seed)
+            self.init_seed()
+        else:
+            self.init_seed(bump_up=True)
+
     def init_rng(self):
         self.rng = random.Random(self.seed)
         if self.no_logs:
@@ -143,30 +251,15 @@ class Randomizer(BaseRandomizer):
         if self.options["dry-run"]:
             return rando_steps + 1
         else:
+            from gamepatches import GAMEPATCH_TOTAL_STEP_COUNT
+
             return rando_steps + 1 + 1 + GAMEPATCH_TOTAL_STEP_COUNT
 
     def set_progress_callback(self, progress_callback: Callable[[str], None]):
         self.progress_callback = progress_callback
 
     def randomize(self, update_progress_dialog=None):
-        useroutput = UserOutput(GenerationFailed, self.progress_callback)
-        self.init_rng()
-        self.rando = Rando(self.areas, self.options, self.rng, useroutput)
-
-        if update_progress_dialog is not None:
-            update_progress_dialog(
-                self.randomizer_hash, self.get_total_progress_steps()
-            )
-
-        self.progress_callback("randomizing items...")
-        self.rando.randomize(useroutput)
-        self.progress_callback("preparing for hints...")
-        self.logic = self.rando.extract_hint_logic()
-        del self.rando
-        self.logic.check(useroutput)
-        self.progress_callback("generating hints...")
-        self.hints = Hints(self.options, self.rng, self.areas, self.logic)
-        self.hints.do_hints(useroutput)
+        self.generate(update_progress_dialog)
         if self.no_logs:
             self.progress_callback("writing anti spoiler log...")
         else:
@@ -176,51 +269,57 @@ class Randomizer(BaseRandomizer):
             (self.log_file_path / f"placement_file_{self.seed}.json").write_text(
                 plcmt_file.to_json_str()
             )
+        if self.options["out-binary-placement-file"] and not self.no_logs:
+            (self.log_file_path / f"placement_file_{self.seed}.sspf").write_bytes(
+                plcmt_file.to_binary(self.areas)
+            )
 
         anti = "Anti " if self.no_logs else ""
-        ext = "json" if self.options["json"] else "txt"
+        if self.options["ndjson"]:
+            ext = "ndjson"
+        elif self.options["json"]:
+            ext = "json"
+        else:
+            ext = "txt"
         log_address = self.log_file_path / (
             f"SS Random {self.seed} - {anti}Spoiler Log.{ext}"
         )
 
         goals = [DUNGEON_GOALS[dun] for dun in self.logic.required_dungeons] + [DEMISE]
-        sots_items = {
-            goal: self.logic.get_sots_items(
-                EXTENDED_ITEM[self.areas.short_to_full(GOAL_CHECKS[goal])]
-            )
-            for goal in goals
-        }
+        sots_items = {goal: self.analysis.sots_items[goal] for goal in goals}
+        barren_nonprogress = (
+            self.analysis.barren_regions,
+            self.analysis.inaccessible_regions,
+        )
 
-        if self.options["json"]:
-            dump = SpoilerLog.dump_json(
-                self.logic.placement,
-                self.options,
-                hash=self.randomizer_hash,
-                progression_spheres=self.logic.calculate_playthrough_progression_spheres(),
-                hints=self.logic.placement.hints,
-                required_dungeons=self.logic.required_dungeons,
-                sots_items=sots_items,
-                barren_nonprogress=self.logic.get_barren_regions(),
-                randomized_entrances=self.logic.placement.map_transitions,
-            )
-            with log_address.open("w") as f:
+        spoiler_info = dict(
+            hash=self.randomizer_hash,
+            progression_spheres=self.logic.calculate_playthrough_progression_spheres(),
+            hints=self.logic.placement.hints,
+            required_dungeons=self.logic.required_dungeons,
+            sots_items=sots_items,
+            barren_nonprogress=barren_nonprogress,
+            randomized_entrances=self.logic.placement.map_transitions,
+        )
+
+        with log_address.open("w") as f:
+            if self.options["ndjson"]:
+                SpoilerLog.write_ndjson(
+                    f, self.logic.placement, self.options, **spoiler_info
+                )
+            elif self.options["json"]:
+                dump = SpoilerLog.dump_json(
+                    self.logic.placement, self.options, **spoiler_info
+                )
                 json.dump(dump, f, indent=2)
-        else:
-            with log_address.open("w") as f:
+            else:
                 SpoilerLog.write(
-                    f,
-                    self.logic.placement,
-                    self.options,
-                    self.areas,
-                    hash=self.randomizer_hash,
-                    progression_spheres=self.logic.calculate_playthrough_progression_spheres(),
-                    hints=self.logic.placement.hints,
-                    required_dungeons=self.logic.required_dungeons,
-                    sots_items=sots_items,
-                    barren_nonprogress=self.logic.get_barren_regions(),
-                    randomized_entrances=self.logic.placement.map_transitions,
+                    f, self.logic.placement, self.options, self.areas, **spoiler_info
                 )
         if not self.options["dry-run"]:
+            # Dry runs don't need the patching code, nor the image libraries it uses
+            from gamepatches import GamePatcher
+
             GamePatcher(
                 self.areas,
                 self.options,
@@ -235,6 +334,32 @@ class Randomizer(BaseRandomizer):
             ).do_all_gamepatches()
             self.progress_callback("patching done")
 
+    def generate(self, update_progress_dialog=None):
+        """Places the items and the hints, raises GenerationFailed if the seed fails"""
+        useroutput = UserOutput(
+            GenerationFailed, self.progress_callback, SettingsInfeasible
+        )
+        self.init_rng()
+        self.rando = Rando(self.areas, self.options, self.rng, useroutput)
+
+        if update_progress_dialog is not None:
+            update_progress_dialog(
+                self.randomizer_hash, self.get_total_progress_steps()
+            )
+
+        self.progress_callback("randomizing items...")
+        self.rando.randomize(useroutput)
+        self.progress_callback("preparing for hints...")
+        self.logic = self.rando.extract_hint_logic()
+        del self.rando
+        self.logic.check(useroutput)
+        self.analysis = self.logic.analyse_usefulness()
+        self.progress_callback("generating hints...")
+        self.hints = Hints(
+            self.options, self.rng, self.areas, self.logic, self.analysis
+        )
+        self.hints.do_hints(useroutput)
+
     def get_placement_file(self):
         MAX_SEED = 1_000_000
         # temporary placement file stuff
@@ -275,9 +400,13 @@ class PlandoRandomizer(BaseRandomizer):
 
     @cached_property
     def get_total_progress_steps(self):
+        from gamepatches import GAMEPATCH_TOTAL_STEP_COUNT
+
         return GAMEPATCH_TOTAL_STEP_COUNT
 
     def randomize(self):
+        from gamepatches import GamePatcher
+
         GamePatcher(
             self.areas,
             self.placement_file.options,
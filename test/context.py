@@ -3,3 +3,17 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import sslib
+
+
+areas = None
+
+
+def get_areas():
+    """The areas can only be built once per process, so the tests share them"""
+    global areas
+    if areas is None:
+        from logic.logic_input import Areas
+        from yaml_files import requirements, checks, hints, map_exits
+
+        areas = Areas(requirements, checks, hints, map_exits)
+    return areas
@@ -0,0 +1,59 @@
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from context import get_areas
+from ssrando import GenerationFailed, SettingsInfeasible
+from options import Options, OPTIONS
+from logic.constants import *
+from logic.feasibility import region_checks
+from logic.fill_algo_common import UserOutput
+from logic.logic import Placement
+from logic.randomize import Rando
+
+import pytest
+
+areas = get_areas()
+useroutput = UserOutput(GenerationFailed, lambda s: None, SettingsInfeasible)
+
+
+def test_default_settings():
+    opts = Options()
+    for i in range(3):
+        opts.set_option("seed", i)
+        Rando(areas, opts, random.Random(i), useroutput)
+
+
+def test_full_region():
+    # Every Sky Keep check is already taken, but the triforces must be placed there
+    opts = Options()
+    opts.set_option("triforce-shuffle", "Sky Keep")
+    opts.set_option("rupeesanity", True)
+    sky_keep = areas.short_to_full("Sky Keep")
+    opts.options["placement"] = Placement(
+        locations={loc: EIN(GREEN_RUPEE) for loc in region_checks(areas, sky_keep)}
+    )
+    with pytest.raises(SettingsInfeasible, match=r"must be placed in \\Sky Keep"):
+        Rando(areas, opts, random.Random(0), useroutput)
+
+
+def test_excluded_dungeon():
+    # Whether the keys are progress items depends on the required dungeons,
+    # so another seed may generate
+    opts = Options()
+    opts.set_option("small-key-mode", "Own Dungeon - Restricted")
+    skyview = [
+        loc
+        for loc in OPTIONS["excluded-locations"]["choices"]
+        if loc.startswith("Skyview - ")
+    ]
+    opts.set_option(
+        "excluded-locations",
+        list(dict.fromkeys(opts["excluded-locations"] + skyview[:-1])),
+    )
+    with pytest.raises(GenerationFailed) as e:
+        Rando(areas, opts, random.Random(3), useroutput)
+    assert not isinstance(e.value, SettingsInfeasible)
+    assert "progress items must be placed in \\Skyview\\Main" in str(e.value)
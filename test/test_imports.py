@@ -0,0 +1,53 @@
+import sys
+import os
+import json
+import subprocess
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Generous, importing ssrando for a dry run should take a fraction of that
+IMPORT_TIME_BUDGET = 2.0
+
+# Only needed to patch the game or by the GUI
+PATCHING_MODULES = ["gamepatches", "sslib.allpatch", "colorReplace", "cv2", "numpy"]
+
+
+def test_dry_run_imports():
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import ssrando\n"
+        "print(json.dumps([time.perf_counter() - start, list(sys.modules)]))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    import_time, modules = json.loads(output.splitlines()[-1])
+
+    assert not [module for module in PATCHING_MODULES if module in modules]
+    assert not [module for module in modules if module.startswith("PySide6")]
+    assert (
+        import_time < IMPORT_TIME_BUDGET
+    ), f"importing ssrando took {import_time:.2f}s"
+
+
+def test_placement_file_imports():
+    # Patching a placement file only needs the patch areas, not the logic
+    script = (
+        "import json, yaml_files\n"
+        "import randoscript\n"
+        "print(json.dumps([name in vars(yaml_files) for name in "
+        "('requirements', 'hints', 'map_exits')]))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    assert not any(json.loads(output.splitlines()[-1]))
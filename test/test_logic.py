@@ -3,17 +3,20 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from context import get_areas
 from ssrando import Randomizer
 from options import Options
-from yaml_files import requirements, checks, hints, map_exits
-from logic.logic_input import Areas
 from logic.fill_algo_common import UserOutput
+from logic.randomize import Rando
+from logic.logic import Logic
+from logic.inventory import EXTENDED_ITEM
 
+import random
 import time
 import json
 
-areas = Areas(requirements, checks, hints, map_exits)
-useroutput = UserOutput(Exception, lambda s: None)
+areas = get_areas()
+useroutput = UserOutput(Exception, lambda s: None, Exception)
 
 
 def check_logs():
@@ -81,3 +84,44 @@ def test_barren():
         rando.logic.get_barren_regions()
         # with open(f'testlogs/log4_{i:02}.json','w') as f:
         #     json.dump(rando.logic.get_barren_regions(), f, indent=2)
+
+
+def test_full_entrance_rando():
+    # Used to fail about one seed out of seven before the fill,
+    # the random links leaving some objectives unreachable
+    opts = Options()
+    opts.set_option("randomize-entrances", "All")
+    for i in range(10):
+        opts.set_option("seed", i)
+        rando = Rando(areas, opts, random.Random(i), useroutput)
+        assert rando.placement.map_transitions
+
+
+def test_front_fill_useful_items():
+    # get_useful_items relies on the full inventory being filled and on the
+    # dependents of the logic covering every reverse edge of the requirements
+    opts = Options()
+    opts.set_option("tadtonesanity", True)
+    rng = random.Random(0)
+    rando = Rando(areas, opts, rng, useroutput, fill_algorithm="Front Fill")
+    front_fill = rando.rando_algo
+    front_fill.useroutput = useroutput
+    front_fill.randomize_dungeon_items()
+    logic = front_fill.logic
+
+    unplaced = list(front_fill.progress_items)
+    rng.shuffle(unplaced)
+    while unplaced:
+        useful_items = {
+            item
+            for item in unplaced
+            if not Logic.is_full_inventory(
+                logic.requirements, logic.full_inventory | EXTENDED_ITEM[item]
+            )
+        }
+        assert front_fill.get_useful_items(unplaced) == useful_items
+        # Places a useful item whenever possible to go through the whole game
+        item = next((item for item in unplaced if item in useful_items), unplaced[0])
+        location = rng.choice(logic.accessible_empty_checks())
+        logic.place_item(location, item)
+        unplaced.remove(item)
@@ -0,0 +1,40 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from options import Options, OPTIONS
+
+
+def test_permalink_roundtrip():
+    permalink = Options().get_permalink(exclude_seed=True)
+    opts = Options()
+    opts.update_from_permalink(permalink + "#5")
+    assert opts["seed"] == 5
+    assert opts.get_permalink() == permalink + "#5"
+    assert opts.get_permalink(exclude_seed=True) == permalink
+
+    opts = Options()
+    opts.set_option("excluded-locations", OPTIONS["excluded-locations"]["choices"][::7])
+    # More copies than there are in the choices are not kept
+    opts.set_option(
+        "starting-items", ["Key Piece"] * 7 + ["Progressive Bow", "Clawshots"]
+    )
+    round_tripped = Options()
+    round_tripped.update_from_permalink(opts.get_permalink())
+    assert round_tripped["excluded-locations"] == opts["excluded-locations"]
+    assert sorted(round_tripped["starting-items"]) == sorted(
+        ["Key Piece"] * 5 + ["Progressive Bow", "Clawshots"]
+    )
+    for option_name, option in OPTIONS.items():
+        if option.get("permalink", True) and "items" not in option_name:
+            assert round_tripped[option_name] == opts[option_name]
+
+
+def test_short_permalink():
+    try:
+        Options().update_from_permalink(Options().get_permalink()[:8])
+    except IndexError:
+        pass
+    else:
+        assert False, "truncated permalink was read"
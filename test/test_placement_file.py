@@ -1,33 +1,31 @@
 import sys
 import os
+import json
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from ssrando import Hints, Randomizer, GenerationFailed
+from ssrando import Randomizer, GenerationFailed
 from options import Options
-from logic.logic_input import Areas
-from logic.placement_file import PlacementFile
-from logic.fill_algo_common import UserOutput
-from yaml_files import requirements, checks, hints, map_exits
+from context import get_areas
+from logic.placement_file import PlacementFile, InvalidPlacementFile
+from logic.patch_areas import PatchAreas
+from logic.constants import *
+from version import VERSION
 
 
 def test_roundtrip():
-    areas = Areas(requirements, checks, hints, map_exits)
-    useroutput = UserOutput(GenerationFailed, lambda s: None)
+    areas = get_areas()
     opts = Options()
     opts.set_option("dry-run", True)
+    generated = 0
     for i in range(5):
         opts.set_option("seed", i)
         rando = Randomizer(areas, opts)
-        rando.rando.randomize(useroutput)
-        rando.logic = rando.rando.extract_hint_logic()
-        del rando.rando
         try:
-            rando.logic.check(useroutput)
+            rando.generate()
         except GenerationFailed:
-            return
-        rando.hints = Hints(rando.options, rando.rng, rando.areas, rando.logic)
-        rando.hints.do_hints(useroutput)
+            continue
+        generated += 1
         plcmt_file = rando.get_placement_file()
         round_tripped_file = PlacementFile()
         round_tripped_file.read_from_str(plcmt_file.to_json_str())
@@ -40,3 +38,75 @@ def test_roundtrip():
         assert plcmt_file.required_dungeons == round_tripped_file.required_dungeons
         assert plcmt_file.starting_items == round_tripped_file.starting_items
         assert plcmt_file.version == round_tripped_file.version
+
+        binary_file = PlacementFile()
+        binary_file.read_from_binary(plcmt_file.to_binary(areas), areas)
+        assert binary_file.prevalidated
+        assert binary_file.to_json_str() == plcmt_file.to_json_str()
+    assert generated
+
+
+def test_binary_roundtrip():
+    areas = get_areas()
+    plcmt_file = PlacementFile()
+    plcmt_file.version = VERSION
+    plcmt_file.hash_str = "Some Hash Words"
+    plcmt_file.starting_items = [EMERALD_TABLET]
+    plcmt_file.required_dungeons = [SV, FS]
+    plcmt_file.item_locations = {loc: number(GREEN_RUPEE, 0) for loc in areas.checks}
+    plcmt_file.chest_dowsing = {loc: 8 for loc in areas.checks}
+    plcmt_file.hints = {
+        loc: ["Some hint", "Ünïcode hint"]
+        for loc in [FI_HINTS_KEY, *areas.gossip_stones, *SONG_HINTS]
+    }
+    plcmt_file.map_connections = {"Some Exit": "Some Entrance"}
+    plcmt_file.trial_object_seed = 123
+    plcmt_file.music_rando_seed = -1
+    plcmt_file.bk_angle_seed = 2**32 - 1
+
+    for compress in (True, False):
+        data = plcmt_file.to_binary(areas, compress)
+        round_tripped_file = PlacementFile()
+        round_tripped_file.read_from_binary(data, areas)
+        assert round_tripped_file.prevalidated
+        assert round_tripped_file.to_json_str() == plcmt_file.to_json_str()
+
+    # A modified file is read, but has to be validated again
+    data = bytearray(plcmt_file.to_binary(areas, compress=False))
+    data[-1] ^= 1
+    modified_file = PlacementFile()
+    modified_file.read_from_binary(bytes(data), areas)
+    assert not modified_file.prevalidated
+
+    try:
+        PlacementFile().read_from_binary(plcmt_file.to_binary(areas)[:-10], areas)
+    except InvalidPlacementFile:
+        pass
+    else:
+        assert False, "truncated placement file was read"
+
+
+def test_patch_areas():
+    areas = get_areas()
+    patch_areas = PatchAreas.from_table(
+        json.loads(json.dumps(PatchAreas.from_areas(areas).to_table("key")))
+    )
+    assert list(patch_areas.checks) == list(areas.checks)
+    assert list(patch_areas.gossip_stones) == list(areas.gossip_stones)
+    for name in [START, EXIT_TO_TURF, TURF_ENTRANCE, *RUPEE_CHECKS]:
+        assert patch_areas.short_to_full(name) == areas.short_to_full(name)
+    for check in areas.checks:
+        assert patch_areas.prettify(check) == areas.prettify(check)
+
+    # Binary placement files are read the same with either
+    plcmt_file = PlacementFile()
+    plcmt_file.version = VERSION
+    plcmt_file.item_locations = {loc: number(GREEN_RUPEE, 0) for loc in areas.checks}
+    plcmt_file.chest_dowsing = {loc: 8 for loc in areas.checks}
+    plcmt_file.hints = {
+        loc: ["Some hint"] for loc in [FI_HINTS_KEY, *areas.gossip_stones, *SONG_HINTS]
+    }
+    read_file = PlacementFile()
+    read_file.read_from_binary(plcmt_file.to_binary(areas), patch_areas)
+    assert read_file.prevalidated
+    assert read_file.to_json_str() == plcmt_file.to_json_str()
@@ -0,0 +1,28 @@
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from context import get_areas
+from options import Options
+from randoserver import RandoServer
+
+
+def test_requests():
+    server = RandoServer(get_areas(), Options())
+
+    response = json.loads(server.handle_line('{"id": 1, "seed": 0}'))
+    assert response["id"] == 1 and "error" not in response
+    assert response["seed"] == 0
+    spoiler_log = response["files"]["SS Random 0 - Spoiler Log.txt"]
+    assert response["hash"] in spoiler_log
+    placement = json.loads(response["files"]["placement_file_0.json"])
+    assert placement["hash"] == response["hash"]
+
+    response = json.loads(server.handle_line('{"id": 2, "seed": "0"}'))
+    assert response["id"] == 2 and "error" in response
+    response = json.loads(server.handle_line('{"id": 3, "placement-file": "{}"}'))
+    assert response["id"] == 3 and "error" in response
+    response = json.loads(server.handle_line("[3]"))
+    assert "error" in response
@@ -0,0 +1,38 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.weighted_sampler import WeightedSampler
+
+import random
+
+
+def test_same_draws_as_choices():
+    rng = random.Random(0)
+    for size in (1, 2, 7, 64, 300):
+        weights = [rng.choice((0, 0, 1, 2, 5, 40)) for _ in range(size)]
+        weights[rng.randrange(size)] = 1
+        sampler = WeightedSampler(size)
+        for slot, weight in enumerate(weights):
+            # Weights given at time 3
+            sampler.set_weight(slot, weight + 3, -1)
+        assert sampler.total(3) == sum(weights)
+
+        rng1 = random.Random(size)
+        rng2 = random.Random(size)
+        for _ in range(200):
+            assert (
+                sampler.sample(rng1, 3) == rng2.choices(range(size), weights=weights)[0]
+            )
+
+
+def test_updates():
+    sampler = WeightedSampler(5)
+    sampler.set_weight(1, 4)
+    sampler.set_weight(3, 10, -2)
+    assert sampler.total() == 14
+    assert sampler.total(5) == 4
+    sampler.set_weight(1, 0)
+    rng = random.Random(0)
+    assert all(sampler.sample(rng, 2) == 3 for _ in range(50))
@@ -3,9 +3,15 @@ from paths import RANDO_ROOT_PATH
 from pathlib import Path
 import yaml
 
+try:
+    # Much faster, if PyYAML was built with libyaml
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 # from: https://gist.github.com/pypt/94d747fe5180851196eb?permalink_comment_id=4015118#gistcomment-4015118
-class UniqueKeyLoader(yaml.SafeLoader):
+class UniqueKeyLoader(SafeLoader):
     def construct_mapping(self, node, deep=False):
         mapping = set()
         for key_node, value_node in node.value:
@@ -22,36 +28,17 @@ def yaml_load(file_path: Path):
 
 
 beedle_texts_file = RANDO_ROOT_PATH / "beedle_texts.yaml"
-beedle_texts = yaml_load(beedle_texts_file)
-
 checks_file = RANDO_ROOT_PATH / "checks.yaml"
-checks = yaml_load(checks_file)
-
 eventpatches_file = RANDO_ROOT_PATH / "eventpatches.yaml"
-eventpatches = yaml_load(eventpatches_file)
-
 hints_file = RANDO_ROOT_PATH / "hints.yaml"
-hints = yaml_load(hints_file)
-
 items_file = RANDO_ROOT_PATH / "items.yaml"
-items = yaml_load(items_file)
-
 map_exits_file = RANDO_ROOT_PATH / "entrances.yaml"
-map_exits = yaml_load(map_exits_file)
-
 music_file = RANDO_ROOT_PATH / "music.yaml"
-music = yaml_load(music_file)
-
 options_file = RANDO_ROOT_PATH / "options.yaml"
-options = yaml_load(options_file)
-
 patches_file = RANDO_ROOT_PATH / "patches.yaml"
-patches = yaml_load(patches_file)
-
 glitchless_requirements_file = (
     RANDO_ROOT_PATH / "SS Rando Logic - Glitchless Requirements.yaml"
 )
-glitchless_requirements = yaml_load(glitchless_requirements_file)
 
 
 def requirements_gen(folder: Path):
@@ -68,4 +55,18 @@ def requirements_gen(folder: Path):
 
 
 requirements_folder = RANDO_ROOT_PATH / "logic" / "requirements"
-requirements = requirements_gen(requirements_folder)
+
+
+def __getattr__(name: str):
+    """
+    The YAML files are only loaded the first time they are used,
+    as `name` for the file at `name_file`, and the requirements
+    """
+    if name == "requirements":
+        value = requirements_gen(requirements_folder)
+    elif isinstance(file := globals().get(f"{name}_file"), Path):
+        value = yaml_load(file)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value